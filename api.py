@@ -1,17 +1,25 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, UploadFile, File, HTTPException, Header, Response
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 import uvicorn
-import tempfile
+import asyncio
 import os
-import json
+import time
 
 # Import your existing modules
-from extractor import extract_speedmechome_invoice, validate_invoice
-from pdf_processor import PDFProcessor
-from models import InvoiceModel
+import config
+from models import InvoiceModel, ExtractionResponse, ProfiledExtractionResponse
+from pipeline import run_pipeline, init_worker, warm_up, worker_ready
+from workers import ExtractionPool, PoolSaturated, MP_CONTEXT
+from jobs import QUEUED, RUNNING, JobStore, JobRunner, JobStatusResponse
+from batch import iter_batch_documents, stream_batch_results
+from cache import ResultCache
+import metrics
+from uploads import (MULTIPART_OVERHEAD_BYTES, UploadRejected, inspect_pdf, read_pdf_upload, read_upload,
+                     too_large_message)
 
 app = FastAPI(
     title="SPEEDMECAHOME Invoice API",
@@ -28,14 +36,145 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Response models
-class ExtractionResponse(BaseModel):
-    success: bool
-    data: Optional[InvoiceModel] = None
-    errors: List[str] = []
-    warnings: List[str] = []
-    validation_passed: bool = False
+# Worker processes for the CPU-bound extraction pipeline, sharing one cap on
+# concurrent tesseract runs so parallel requests don't oversubscribe the CPU
+def worker_initargs() -> tuple:
+    """init_worker arguments for a new pool: a fresh OCR semaphore each time, since
+    a worker killed while holding a slot (e.g. OOM) never gives it back"""
+    return MP_CONTEXT.BoundedSemaphore(config.OCR_MAX_CONCURRENCY), config.WARMUP_ON_STARTUP
+
+extraction_pool = ExtractionPool(initializer=init_worker, initargs=worker_initargs)
+
+# Results of already seen PDFs, keyed by content hash
+result_cache = ResultCache()
+
+async def extract_with_cache(content: bytes, wait: bool = False) -> ExtractionResponse:
+    """Return the cached result for this PDF, or run the pipeline in the pool and cache it"""
+    response, _ = await extract_with_stats(content, wait=wait)
+    return response
+
+async def extract_with_stats(content: bytes, wait: bool = False,
+                             profile: bool = False) -> Tuple[ExtractionResponse, Dict[str, Any]]:
+    """extract_with_cache, plus the pipeline stats of this run ({"cache": "hit"} for cached results)
+    
+    `profile` skips the cache lookup so the pipeline really runs under the profiler.
+    """
+    if profile:
+        # Not counted as a cache hit or miss either
+        key = await asyncio.to_thread(result_cache.key, content)
+    else:
+        key, cached = await asyncio.to_thread(result_cache.lookup, content)
+        if cached is not None:
+            metrics.EXTRACTIONS.inc(outcome="cache_hit")
+            return cached, {"cache": "hit"}
+    
+    try:
+        response, stats = await extraction_pool.run(run_pipeline, content, profile, wait=wait)
+    except PoolSaturated:
+        metrics.EXTRACTIONS.inc(outcome="rejected")
+        raise
+    except Exception:
+        metrics.EXTRACTIONS.inc(outcome="error")
+        raise
+    metrics.observe_pipeline(stats)
+    metrics.EXTRACTIONS.inc(outcome="success" if response.success else "failure")
+    await asyncio.to_thread(result_cache.put, key, response)
+    return response, stats
+
+def server_timing(stats: Dict[str, Any], request_timings: Dict[str, float]) -> str:
+    """Server-Timing header value: request-level (upload) and pipeline stage durations in milliseconds"""
+    entries = [f"{stage};dur={seconds * 1000:.2f}" for stage, seconds in request_timings.items()]
+    for stage, seconds in stats.get("timings", {}).items():
+        entries.append(f"{stage};dur={seconds * 1000:.2f}")
+    if stats.get("cache"):
+        entries.append(f'cache;desc="{stats["cache"]}"')
+    return ", ".join(entries)
+
+# Persistent queue behind POST /jobs, drained through the same pool
+job_store = JobStore()
+job_runner = JobRunner(job_store, lambda content: extract_with_cache(content, wait=True))
+
+# Requests currently being handled, for /metrics
+http_in_flight = 0
+
+@app.middleware("http")
+async def count_in_flight(request, call_next):
+    global http_in_flight
+    http_in_flight += 1
+    try:
+        return await call_next(request)
+    finally:
+        http_in_flight -= 1
+
+metrics.REGISTRY.register(metrics.Gauge(
+    "http_requests_in_flight", "HTTP requests currently being handled", lambda: http_in_flight
+))
+metrics.REGISTRY.register(metrics.Gauge(
+    "extraction_pool_in_flight", "Extractions running in a worker", lambda: extraction_pool.in_flight
+))
+metrics.REGISTRY.register(metrics.Gauge(
+    "extraction_pool_queue_depth", "Extractions admitted and waiting for a free worker",
+    lambda: extraction_pool.queue_depth
+))
+metrics.REGISTRY.register(metrics.Gauge(
+    "jobs_queued", "Jobs submitted to POST /jobs and not yet picked up", lambda: job_store.count(QUEUED)
+))
+metrics.REGISTRY.register(metrics.Gauge(
+    "jobs_running", "Jobs currently being extracted", lambda: job_store.count(RUNNING)
+))
+
+# Single-file upload endpoints whose Content-Length alone can show the file is too large
+_SINGLE_UPLOAD_PATHS = {"/extract-invoice", "/jobs"}
 
+@app.middleware("http")
+async def reject_oversized_uploads(request, call_next):
+    # Runs before the multipart body is parsed, so the upload is never spooled
+    if request.method == "POST" and request.url.path in _SINGLE_UPLOAD_PATHS:
+        try:
+            length = int(request.headers.get("content-length", 0))
+        except ValueError:
+            length = 0
+        if length > config.MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES:
+            return JSONResponse(status_code=413, content={"detail": too_large_message()})
+    return await call_next(request)
+
+# Set once the instance can serve extractions at full speed (see /ready)
+instance_ready = False
+
+async def warm_up_instance():
+    global instance_ready
+    start = time.perf_counter()
+    try:
+        # This process needs fitz for upload checks, and runs OCR itself without workers
+        await asyncio.to_thread(warm_up, extraction_pool.workers <= 0)
+        # Start every worker now; each one warms itself up in init_worker
+        await asyncio.gather(*(extraction_pool.run(worker_ready, wait=True)
+                               for _ in range(max(extraction_pool.workers, 0))))
+    except Exception as e:
+        print(f"⚠ Warm-up failed: {e}")
+    instance_ready = True
+    print(f"✓ Instance warmed up in {time.perf_counter() - start:.1f}s")
+
+@app.on_event("startup")
+async def start_extraction_pool():
+    global instance_ready
+    if extraction_pool.workers <= 0:
+        # Extractions run in this process; set it up like a pool worker, on the main thread
+        init_worker()
+    extraction_pool.start()
+    await job_runner.start()
+    if config.WARMUP_ON_STARTUP:
+        # In the background, so / answers (and the platform sees a live port) while warming up
+        app.state.warm_up_task = asyncio.create_task(warm_up_instance())
+    else:
+        instance_ready = True
+
+@app.on_event("shutdown")
+async def stop_extraction_pool():
+    await job_runner.stop()
+    extraction_pool.shutdown()
+
+# Response models
 class ValidationResult(BaseModel):
     field: str
     status: str  # "valid", "warning", "error"
@@ -52,11 +191,33 @@ class ValidationResponse(BaseModel):
 async def root():
     return {"message": "SPEEDMECAHOME Invoice API", "status": "running"}
 
+@app.get("/ready")
+async def ready():
+    """
+    Readiness probe: 503 until the startup warm-up (WARMUP_ON_STARTUP) has finished
+    """
+    if not instance_ready:
+        raise HTTPException(
+            status_code=503,
+            detail="Warming up",
+            headers={"Retry-After": "1"}
+        )
+    return {"status": "ready"}
+
 @app.post("/extract-invoice", response_model=ExtractionResponse)
-async def extract_invoice(file: UploadFile = File(...)):
+async def extract_invoice(http_response: Response, file: UploadFile = File(...), profile: bool = False,
+                          x_profile: Optional[str] = Header(None)):
     """
     Extract data from uploaded invoice PDF
+    
+    Stage durations are returned in the Server-Timing header. With ?profile=1
+    or X-Profile: 1 (PROFILING_ENABLED only), the response also carries a
+    sampled profile of the pipeline's hot functions.
     """
+    profile = profile or (x_profile or "").strip().lower() in ("1", "true", "yes", "on")
+    if profile and not config.PROFILING_ENABLED:
+        raise HTTPException(status_code=403, detail="Profiling is disabled on this server")
+    
     try:
         # Validate file type
         if not file.filename.lower().endswith('.pdf'):
@@ -65,55 +226,93 @@ async def extract_invoice(file: UploadFile = File(...)):
                 errors=["Only PDF files are supported"]
             )
         
-        # Save uploaded file temporarily
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_file:
-            content = await file.read()
-            temp_file.write(content)
-            temp_path = temp_file.name
-        
+        # Read in chunks and reject non-PDFs, encrypted or oversized files before any extraction work
+        request_timings = {}
         try:
-            # Process PDF
-            processor = PDFProcessor()
-            
-            # Validate it's a SPEEDMECAHOME invoice
-            if not processor.validate_pdf_structure(temp_path):
-                return ExtractionResponse(
-                    success=False,
-                    errors=["The uploaded file doesn't appear to be a valid SPEEDMECAHOME invoice"]
-                )
-            
-            # Extract text
-            invoice_text = processor.extract_text_from_pdf(temp_path)
-            
-            if not invoice_text or len(invoice_text.strip()) < 50:
-                return ExtractionResponse(
-                    success=False,
-                    errors=["Could not extract sufficient text from the PDF"]
-                )
-            
-            # Extract structured data
-            invoice_data = extract_speedmechome_invoice(invoice_text)
-            
-            # Validate the extracted data
-            validation_passed = validate_invoice(invoice_data)
-            
-            return ExtractionResponse(
-                success=True,
-                data=invoice_data,
-                validation_passed=validation_passed,
-                warnings=["Some data validation issues found"] if not validation_passed else []
+            read_start = time.perf_counter()
+            content = await read_upload(file)
+            request_timings["upload_read"] = time.perf_counter() - read_start
+            check_start = time.perf_counter()
+            reason = await asyncio.to_thread(inspect_pdf, content)
+            request_timings["upload_check"] = time.perf_counter() - check_start
+        except UploadRejected as e:
+            if e.status_code == 413:
+                raise HTTPException(status_code=413, detail=e.message)
+            reason = e.message
+        for stage, seconds in request_timings.items():
+            metrics.STAGE_SECONDS.observe(seconds, stage=stage)
+        if reason is not None:
+            metrics.EXTRACTIONS.inc(outcome="invalid_upload")
+            if request_timings:
+                http_response.headers["Server-Timing"] = server_timing({}, request_timings)
+            return ExtractionResponse(success=False, errors=[reason])
+        
+        # The PDF -> InvoiceModel work is CPU-bound; keep it off the event loop
+        response, stats = await extract_with_stats(content, profile=profile)
+        timing = server_timing(stats, request_timings)
+        
+        if profile:
+            return JSONResponse(
+                content=jsonable_encoder(ProfiledExtractionResponse(**response.dict(), profile=stats.get("profile", {}))),
+                headers={"Server-Timing": timing}
             )
+        http_response.headers["Server-Timing"] = timing
+        return response
             
-        finally:
-            # Clean up temp file
-            os.unlink(temp_path)
-            
+    except PoolSaturated:
+        raise HTTPException(
+            status_code=503,
+            detail="Server is busy processing other invoices, please retry shortly",
+            headers={"Retry-After": str(config.RETRY_AFTER_SECONDS)}
+        )
+    except HTTPException:
+        raise
     except Exception as e:
         return ExtractionResponse(
             success=False,
             errors=[f"Processing error: {str(e)}"]
         )
 
+@app.post("/extract-invoices")
+async def extract_invoices(files: List[UploadFile] = File(...)):
+    """
+    Extract many invoices (PDF files and/or zip archives of PDFs)
+    
+    Streams one BatchExtractionResult per line (NDJSON) as each document finishes.
+    """
+    results = stream_batch_results(
+        iter_batch_documents(files),
+        lambda content: extract_with_cache(content, wait=True)
+    )
+    return StreamingResponse(results, media_type="application/x-ndjson")
+
+@app.post("/jobs", response_model=JobStatusResponse, status_code=202)
+async def submit_extraction_job(file: UploadFile = File(...)):
+    """
+    Queue an invoice PDF for extraction and return the job id immediately
+    """
+    if not file.filename.lower().endswith('.pdf'):
+        raise HTTPException(status_code=400, detail="Only PDF files are supported")
+    
+    try:
+        content = await read_pdf_upload(file)
+    except UploadRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+    job_id = await asyncio.to_thread(job_store.submit, content)
+    job_runner.notify()
+    
+    return await asyncio.to_thread(job_store.get, job_id)
+
+@app.get("/jobs/{job_id}", response_model=JobStatusResponse)
+async def get_extraction_job(job_id: str):
+    """
+    Get the status of an extraction job, with its ExtractionResponse once done
+    """
+    job = await asyncio.to_thread(job_store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
 @app.post("/validate-invoice", response_model=ValidationResponse)
 async def validate_invoice_data(data: InvoiceModel):
     """
@@ -191,6 +390,21 @@ async def validate_invoice_data(data: InvoiceModel):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Validation error: {str(e)}")
 
+@app.get("/cache-stats")
+async def get_cache_stats():
+    """
+    Hit/miss counters of the extraction result cache
+    """
+    return result_cache.stats()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """
+    Prometheus metrics: per-stage latency histograms, extraction outcomes, OCR fallback, pool and job queue load
+    """
+    # The job gauges query SQLite; keep that off the event loop
+    return PlainTextResponse(await asyncio.to_thread(metrics.REGISTRY.render), media_type=metrics.CONTENT_TYPE)
+
 @app.get("/invoice-template")
 async def get_invoice_template():
     """
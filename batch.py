@@ -0,0 +1,91 @@
+import asyncio
+import zipfile
+import zlib
+from typing import AsyncIterator, Awaitable, Callable, List, Tuple, Union
+
+from fastapi import UploadFile
+
+import config
+from models import BatchExtractionResult, ExtractionResponse
+from uploads import UploadRejected, inspect_pdf, read_pdf_upload, too_large_message
+
+# (filename, PDF bytes) or (filename, error message) for entries that can't be processed
+BatchDocument = Tuple[str, Union[bytes, str]]
+
+async def iter_batch_documents(files: List[UploadFile]) -> AsyncIterator[BatchDocument]:
+    """Yield the PDFs of a batch one at a time, expanding .zip uploads lazily"""
+    for upload in files:
+        name = upload.filename or "upload"
+        lower = name.lower()
+        
+        if lower.endswith('.pdf'):
+            try:
+                yield name, await read_pdf_upload(upload)
+            except UploadRejected as e:
+                yield name, e.message
+        
+        elif lower.endswith('.zip'):
+            try:
+                archive = await asyncio.to_thread(zipfile.ZipFile, upload.file)
+            except zipfile.BadZipFile:
+                yield name, "Invalid zip archive"
+                continue
+            
+            with archive:
+                for info in archive.infolist():
+                    if info.is_dir() or not info.filename.lower().endswith('.pdf'):
+                        continue
+                    # Checked before decompressing, so zip bombs never reach memory
+                    if info.file_size > config.MAX_UPLOAD_BYTES:
+                        yield info.filename, too_large_message()
+                        continue
+                    try:
+                        content = await asyncio.to_thread(archive.read, info)
+                    except (zipfile.BadZipFile, zlib.error, RuntimeError, NotImplementedError, OSError) as e:
+                        # Corrupt, encrypted or unsupported-compression member: skip it, keep the rest of the batch
+                        yield info.filename, f"Unreadable zip entry: {e}"
+                        continue
+                    reason = await asyncio.to_thread(inspect_pdf, content)
+                    yield info.filename, reason if reason is not None else content
+        
+        else:
+            yield name, "Only PDF files are supported"
+
+async def stream_batch_results(documents: AsyncIterator[BatchDocument],
+                               process: Callable[[bytes], Awaitable[ExtractionResponse]],
+                               concurrency: int = config.BATCH_CONCURRENCY) -> AsyncIterator[str]:
+    """Process documents concurrently and yield one NDJSON line per result, in completion order
+    
+    At most `concurrency` documents are read and in flight at a time, so memory
+    stays bounded whatever the batch size, and fast documents are never held
+    back by slow ones.
+    """
+    async def run(index: int, name: str, content: Union[bytes, str]) -> BatchExtractionResult:
+        if isinstance(content, str):
+            response = ExtractionResponse(success=False, errors=[content])
+        else:
+            try:
+                response = await process(content)
+            except Exception as e:
+                response = ExtractionResponse(success=False, errors=[f"Processing error: {str(e)}"])
+        return BatchExtractionResult(index=index, filename=name, **response.dict())
+    
+    pending = set()
+    try:
+        index = 0
+        async for name, content in documents:
+            if len(pending) >= concurrency:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield task.result().json() + "\n"
+            pending.add(asyncio.create_task(run(index, name, content)))
+            index += 1
+        
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield task.result().json() + "\n"
+    finally:
+        # Client went away: don't keep extracting for nobody
+        for task in pending:
+            task.cancel()
@@ -0,0 +1,208 @@
+"""Stage-level benchmarks of the extraction pipeline on synthetic invoices
+
+Times fitz extraction, rendering, OCR, extract_speedmechome_invoice and
+validation separately for each document of a fixed corpus, and saves the
+timings as JSON so two commits can be compared:
+
+    python -m benchmarks.bench_stages                       # writes benchmarks/results/<commit>.json
+    python -m benchmarks.bench_stages --compare old.json    # also prints new/old ratios per stage
+
+Run from the repository root. OCR is skipped (reported as "skipped") when
+tesseract is not installed. The OCR text cache is disabled so every repeat
+does the real work.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+import pytesseract
+
+from benchmarks.synthetic import corpus
+from document import DocumentContext
+from extractor import extract_speedmechome_invoice, validate_invoice
+from pdf_processor import PDFProcessor, open_pdf, render_page
+
+# (name, items, extra pages, scanned, noise)
+CASES = [
+    ("text-3-items", 3, 0, False, 0.0),
+    ("text-40-items", 40, 0, False, 0.0),
+    ("text-15-items-annex", 15, 4, False, 0.0),
+    ("text-120-items", 120, 2, False, 0.0),
+    ("scan-3-items-clean", 3, 0, True, 0.0),
+    ("scan-3-items-noisy", 3, 0, True, 0.3),
+    ("scan-40-items-noisy", 40, 0, True, 0.5),
+]
+
+STAGES = ["fitz", "render", "ocr", "extract", "validate"]
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+def tesseract_available() -> bool:
+    try:
+        pytesseract.get_tesseract_version()
+        return True
+    except Exception:
+        return False
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def time_stage(fn: Callable[[], object], repeats: int) -> Dict[str, float]:
+    """Run `fn` `repeats` times (after one warm-up run) and summarize wall times in seconds"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        fn()
+        samples = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            fn()
+            samples.append(time.perf_counter() - start)
+    return {"median": statistics.median(samples), "min": min(samples), "max": max(samples)}
+
+def _fresh_context(ctx: DocumentContext) -> DocumentContext:
+    # Extraction caches text/lines on the context; time it on an unprimed copy
+    copy = DocumentContext(source=ctx.source)
+    for page, method, words in zip(ctx.pages, ctx.methods, ctx.words):
+        copy.add_page(page, method, words)
+    return copy
+
+def render_first_pass(processor: PDFProcessor, pdf: bytes):
+    """Render every image ocr_pages OCRs (zones, pixel budget), at its first-pass DPI"""
+    doc = open_pdf(pdf)
+    try:
+        for task in processor.ocr_plan(doc):
+            dpi, _ = processor.task_resolution(doc, task)
+            render_page(doc[task.number], dpi, processor.grayscale, clip=task.clip)
+    finally:
+        doc.close()
+
+def bench_document(processor: PDFProcessor, pdf: bytes, repeats: int, with_ocr: bool) -> Dict:
+    stages: Dict[str, object] = {}
+    doc = open_pdf(pdf)
+    page_count = doc.page_count
+    doc.close()
+
+    stages["fitz"] = time_stage(lambda: processor.fitz_layers(pdf), repeats)
+    stages["render"] = time_stage(lambda: render_first_pass(processor, pdf), repeats)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        ctx = processor.build_context(pdf) if with_ocr else None
+    if ctx is None:
+        # Without tesseract only text-layer pages can be extracted
+        with contextlib.redirect_stdout(io.StringIO()):
+            layers = processor.fitz_layers(pdf)
+        if all(len(text.strip()) >= 50 for text, _ in layers):
+            ctx = DocumentContext(source="benchmark")
+            for text, words in layers:
+                ctx.add_page(text, "fitz", words)
+
+    if with_ocr:
+        ocr_page_numbers = [i for i, method in enumerate(ctx.methods) if method == "ocr"]
+        if ocr_page_numbers:
+            # Includes rendering: low-confidence pages are rendered again at a higher DPI
+            def ocr():
+                with contextlib.redirect_stdout(io.StringIO()):
+                    return processor.ocr_pages(pdf, page_numbers=ocr_page_numbers)
+            stages["ocr"] = time_stage(ocr, repeats)
+        else:
+            stages["ocr"] = "not needed"
+    else:
+        stages["ocr"] = "skipped"
+
+    if ctx is None:
+        stages["extract"] = stages["validate"] = "skipped"
+    else:
+        invoice = extract_speedmechome_invoice(_fresh_context(ctx))
+        stages["extract"] = time_stage(lambda: extract_speedmechome_invoice(_fresh_context(ctx)), repeats)
+        stages["validate"] = time_stage(
+            lambda: (processor.validate_pdf_structure(ctx), validate_invoice(invoice)), repeats
+        )
+
+    return {
+        "pages": page_count,
+        "bytes": len(pdf),
+        "ocr_pages": ctx.methods.count("ocr") if ctx is not None else None,
+        "stages": stages,
+    }
+
+def run(repeats: int, case_filter: Optional[List[str]], with_ocr: bool, seed: int) -> Dict:
+    cases = [case for case in CASES if not case_filter or case[0] in case_filter]
+    processor = PDFProcessor(use_ocr_cache=False)
+    results = {}
+    for name, pdf in corpus(cases, seed=seed):
+        print(f"{name}...", file=sys.stderr)
+        results[name] = bench_document(processor, pdf, repeats, with_ocr)
+    return {
+        "commit": git_commit(),
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeats": repeats,
+        "seed": seed,
+        "ocr_available": with_ocr,
+        "cases": results,
+    }
+
+def _median_ms(stage) -> Optional[float]:
+    return stage["median"] * 1000 if isinstance(stage, dict) else None
+
+def print_report(report: Dict, baseline: Optional[Dict] = None):
+    header = f"{'case':<24}" + "".join(f"{stage:>14}" for stage in STAGES)
+    print(f"commit {report['commit']}" + (f" vs {baseline['commit']}" if baseline else "") + " (median ms"
+          + (", new/old ratio" if baseline else "") + ")")
+    print(header)
+    for name, case in report["cases"].items():
+        cells = []
+        for stage in STAGES:
+            current = _median_ms(case["stages"].get(stage))
+            old = _median_ms(baseline["cases"].get(name, {}).get("stages", {}).get(stage)) if baseline else None
+            if current is None:
+                cells.append(f"{'-':>14}")
+            elif old:
+                cells.append(f"{current:>8.2f} x{current / old:<4.2f}")
+            else:
+                cells.append(f"{current:>14.2f}")
+        print(f"{name:<24}" + "".join(cells))
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeats", type=int, default=5, help="timed runs per stage (after one warm-up)")
+    parser.add_argument("--case", action="append", help="only run this case (repeatable)")
+    parser.add_argument("--no-ocr", action="store_true", help="skip OCR even if tesseract is installed")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the synthetic corpus")
+    parser.add_argument("--output", help="JSON file to write (default: benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", help="earlier JSON results to compare against")
+    args = parser.parse_args(argv)
+
+    with_ocr = not args.no_ocr and tesseract_available()
+    if not with_ocr:
+        print("OCR stage skipped (tesseract not available or --no-ocr)", file=sys.stderr)
+
+    report = run(args.repeats, args.case, with_ocr, args.seed)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{report['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}", file=sys.stderr)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+
+if __name__ == "__main__":
+    main()
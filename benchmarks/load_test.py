@@ -0,0 +1,272 @@
+"""HTTP load test of one api:app instance with generated invoices
+
+Starts uvicorn on a free local port (or targets --url), then sends
+/extract-invoice and /validate-invoice requests at a fixed arrival rate with
+a configurable mix, and reports throughput, latency percentiles and error
+rates per request kind:
+
+    python -m benchmarks.load_test --rate 4 --duration 30 --mix text=6,scanned=2,validate=2
+
+Everything runs offline: uploads are synthetic PDFs from benchmarks.synthetic,
+each one unique so the result and OCR caches don't short-circuit the work.
+Latency is measured from each request's scheduled send time, so a server that
+falls behind shows up as growing latency rather than a lower send rate.
+"""
+import argparse
+import contextlib
+import http.client
+import io
+import json
+import math
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from benchmarks.synthetic import generate_invoice, scanned_variant
+from extractor import extract_speedmechome_invoice
+from pdf_processor import PDFProcessor
+
+KINDS = ["text", "scanned", "validate"]
+
+class Sample:
+    __slots__ = ("kind", "status", "latency", "error")
+
+    def __init__(self, kind: str, status: int, latency: float, error: Optional[str] = None):
+        self.kind = kind
+        self.status = status
+        self.latency = latency
+        self.error = error
+
+def parse_mix(value: str) -> Dict[str, float]:
+    """'text=6,scanned=2,validate=2' -> normalized weights"""
+    weights = {}
+    for part in value.split(','):
+        kind, _, weight = part.partition('=')
+        kind = kind.strip()
+        if kind not in KINDS:
+            raise argparse.ArgumentTypeError(f"unknown request kind {kind!r} (expected one of {KINDS})")
+        weights[kind] = float(weight or 1)
+    total = sum(weights.values())
+    if total <= 0:
+        raise argparse.ArgumentTypeError("mix weights must sum to more than 0")
+    return {kind: weight / total for kind, weight in weights.items()}
+
+def multipart_pdf(pdf: bytes, filename: str) -> Tuple[bytes, str]:
+    boundary = uuid.uuid4().hex
+    body = (
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+        "Content-Type: application/pdf\r\n\r\n"
+    ).encode() + pdf + f"\r\n--{boundary}--\r\n".encode()
+    return body, f"multipart/form-data; boundary={boundary}"
+
+class Payloads:
+    """Request bodies per kind, generated up front so the driver only sends bytes"""
+
+    def __init__(self, count: int, seed: int, items: int):
+        rng = random.Random(seed)
+        self.bodies: Dict[str, List[Tuple[str, bytes, str]]] = {kind: [] for kind in KINDS}
+        processor = PDFProcessor(use_ocr_cache=False)
+        for index in range(count):
+            pdf = generate_invoice(rng.randint(1, items), seed=seed + index)
+            body, content_type = multipart_pdf(pdf, f"invoice-{index}.pdf")
+            self.bodies["text"].append(("/extract-invoice", body, content_type))
+
+            scan = scanned_variant(pdf, noise=rng.choice([0.0, 0.2, 0.4]), skew=1.0, seed=seed + index)
+            body, content_type = multipart_pdf(scan, f"scan-{index}.pdf")
+            self.bodies["scanned"].append(("/extract-invoice", body, content_type))
+
+            with contextlib.redirect_stdout(io.StringIO()):
+                invoice = extract_speedmechome_invoice(processor.extract_text_from_pdf(pdf))
+            self.bodies["validate"].append(("/validate-invoice", invoice.json().encode(), "application/json"))
+        self._next = {kind: 0 for kind in KINDS}
+        self._lock = threading.Lock()
+
+    def take(self, kind: str) -> Tuple[str, bytes, str]:
+        with self._lock:
+            bodies = self.bodies[kind]
+            body = bodies[self._next[kind] % len(bodies)]
+            self._next[kind] += 1
+            return body
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def start_server(port: int, env_overrides: Dict[str, str], log_path: str) -> subprocess.Popen:
+    env = dict(os.environ, **env_overrides)
+    log = open(log_path, 'wb')
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        env=env, stdout=log, stderr=subprocess.STDOUT
+    )
+
+def wait_until_up(host: str, port: int, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection(host, port, timeout=2)
+            conn.request("GET", "/")
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"server on {host}:{port} did not come up within {timeout:.0f}s")
+
+def send(host: str, port: int, kind: str, payload: Tuple[str, bytes, str], scheduled: float,
+         timeout: float) -> Sample:
+    path, body, content_type = payload
+    try:
+        conn = http.client.HTTPConnection(host, port, timeout=timeout)
+        conn.request("POST", path, body=body, headers={"Content-Type": content_type})
+        response = conn.getresponse()
+        data = response.read()
+        conn.close()
+        latency = time.perf_counter() - scheduled
+        error = None
+        if response.status != 200:
+            error = f"HTTP {response.status}"
+        elif kind != "validate" and not json.loads(data).get("success"):
+            error = "extraction failed"
+        return Sample(kind, response.status, latency, error)
+    except (OSError, http.client.HTTPException, ValueError) as e:
+        return Sample(kind, 0, time.perf_counter() - scheduled, type(e).__name__)
+
+def drive(host: str, port: int, payloads: Payloads, mix: Dict[str, float], rate: float, duration: float,
+          concurrency: int, timeout: float, seed: int, poisson: bool) -> Tuple[List[Sample], float]:
+    """Send requests at `rate` per second for `duration` seconds, at most `concurrency` at once"""
+    rng = random.Random(seed)
+    kinds, weights = zip(*mix.items())
+    samples: List[Sample] = []
+    futures = []
+    start = time.perf_counter()
+    next_send = start
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        while next_send - start < duration:
+            delay = next_send - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            kind = rng.choices(kinds, weights)[0]
+            futures.append(executor.submit(send, host, port, kind, payloads.take(kind), next_send, timeout))
+            next_send += rng.expovariate(rate) if poisson else 1.0 / rate
+        for future in futures:
+            samples.append(future.result())
+    return samples, time.perf_counter() - start
+
+def percentile(values: List[float], fraction: float) -> float:
+    # Nearest-rank percentile
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+def summarize(samples: List[Sample], elapsed: float) -> Dict[str, Dict]:
+    groups = {"all": samples}
+    for kind in KINDS:
+        kind_samples = [sample for sample in samples if sample.kind == kind]
+        if kind_samples:
+            groups[kind] = kind_samples
+
+    summary = {}
+    for name, group in groups.items():
+        latencies = [sample.latency for sample in group]
+        ok = [sample for sample in group if sample.error is None]
+        errors: Dict[str, int] = {}
+        for sample in group:
+            if sample.error:
+                errors[sample.error] = errors.get(sample.error, 0) + 1
+        summary[name] = {
+            "requests": len(group),
+            "throughput_rps": len(ok) / elapsed if elapsed else 0.0,
+            "error_rate": 1 - len(ok) / len(group),
+            "errors": errors,
+            "p50_ms": percentile(latencies, 0.50) * 1000,
+            "p95_ms": percentile(latencies, 0.95) * 1000,
+            "p99_ms": percentile(latencies, 0.99) * 1000,
+            "mean_ms": statistics.fmean(latencies) * 1000,
+        }
+    return summary
+
+def print_summary(summary: Dict[str, Dict], elapsed: float):
+    print(f"{elapsed:.1f}s elapsed")
+    print(f"{'kind':<10}{'requests':>9}{'ok/s':>8}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, row in summary.items():
+        print(f"{name:<10}{row['requests']:>9}{row['throughput_rps']:>8.2f}{row['error_rate']:>8.1%}"
+              f"{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}{row['p99_ms']:>10.1f}")
+        if row["errors"]:
+            print(f"{'':<10}  " + ", ".join(f"{error}: {count}" for error, count in sorted(row["errors"].items())))
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="target an already running instance instead of starting uvicorn")
+    parser.add_argument("--rate", type=float, default=2.0, help="requests per second")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds of traffic")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("text=6,scanned=2,validate=2"),
+                        help="request kinds and weights, e.g. text=6,scanned=2,validate=2")
+    parser.add_argument("--concurrency", type=int, default=64, help="most requests open at once")
+    parser.add_argument("--poisson", action="store_true", help="exponential inter-arrival times instead of a fixed interval")
+    parser.add_argument("--documents", type=int, default=50, help="distinct generated PDFs per kind")
+    parser.add_argument("--max-items", type=int, default=30, help="most line items per generated invoice")
+    parser.add_argument("--timeout", type=float, default=120.0, help="per-request timeout in seconds")
+    parser.add_argument("--keep-caches", action="store_true", help="leave the result and OCR caches enabled on the started server")
+    parser.add_argument("--env", action="append", default=[], metavar="NAME=VALUE",
+                        help="extra environment for the started server, e.g. WORKER_PROCESSES=2")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the summary as JSON to this file")
+    args = parser.parse_args(argv)
+
+    print(f"Generating {args.documents} documents per kind...", file=sys.stderr)
+    payloads = Payloads(args.documents, args.seed, args.max_items)
+
+    server = None
+    with tempfile.TemporaryDirectory() as workdir:
+        if args.url:
+            target = urlsplit(args.url)
+            host, port = target.hostname, target.port or 80
+        else:
+            host, port = "127.0.0.1", _free_port()
+            env = {"JOBS_DB_PATH": os.path.join(workdir, "jobs.db")}
+            if not args.keep_caches:
+                env.update(RESULT_CACHE_ENTRIES="0", RESULT_CACHE_DIR="", OCR_CACHE_PATH="")
+            env.update(item.split('=', 1) for item in args.env)
+            log_path = os.path.join(workdir, "server.log")
+            server = start_server(port, env, log_path)
+
+        try:
+            try:
+                wait_until_up(host, port)
+            except RuntimeError:
+                if server is not None:
+                    with open(log_path, 'r', errors='replace') as f:
+                        print(f.read()[-4000:], file=sys.stderr)
+                raise
+            print(f"Sending {args.rate:g} req/s for {args.duration:g}s to {host}:{port}...", file=sys.stderr)
+            samples, elapsed = drive(host, port, payloads, args.mix, args.rate, args.duration,
+                                     args.concurrency, args.timeout, args.seed, args.poisson)
+        finally:
+            if server is not None:
+                server.terminate()
+                try:
+                    server.wait(timeout=30)
+                except subprocess.TimeoutExpired:
+                    server.kill()
+
+    summary = summarize(samples, elapsed)
+    print_summary(summary, elapsed)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({"args": {key: value for key, value in vars(args).items()}, "elapsed": elapsed,
+                       "summary": summary}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
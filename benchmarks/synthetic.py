@@ -0,0 +1,170 @@
+"""Synthetic SPEEDMECAHOME invoices for benchmarks and load tests
+
+Pages follow the layout of invoice.pdf (A4, same block positions); the items
+table flows onto extra pages when it does not fit. `scanned_variant` rasterizes
+a generated invoice into an image-only PDF with optional noise and skew, like a
+phone or copier scan.
+"""
+import io
+import random
+from datetime import date, timedelta
+from typing import List, Optional, Tuple
+
+import fitz
+from PIL import Image, ImageFilter
+
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842
+
+# Column x positions of the items table, as in invoice.pdf
+ITEM_HEADER = [(52, '#'), (80, 'Description'), (182, 'Quantité'), (261, 'PU HT'), (338, 'TVA'), (480, 'Total HT')]
+ITEM_COLUMNS_X = [43, 77, 179, 258, 335, 477]
+ITEM_ROW_HEIGHT = 22
+ITEMS_TOP, ITEMS_BOTTOM = 320, 700
+
+PARTS = ['vidange', 'FILTRE HUILE', 'FILTRE A AIR', 'PLAQUETTES FREIN AV', 'DISQUES FREIN',
+         'COURROIE DISTRIBUTION', 'BOUGIES ALLUMAGE', 'LIQUIDE REFROIDISSEMENT', 'BALAIS ESSUIE-GLACE',
+         'BATTERIE 70AH', 'AMORTISSEUR AR', 'MAIN D\'OEUVRE', 'PNEU 205/55 R16', 'DIAGNOSTIC']
+CLIENTS = ['NEXT STEP', 'SOTUVER', 'ATLAS LOGISTIQUE', 'MEDINA TRANSPORT', 'CARTHAGE SERVICES']
+
+def money(value: float) -> str:
+    """51.6 -> '51,600 DT'"""
+    return f"{value:,.3f}".replace(',', ' ').replace('.', ',') + " DT"
+
+def _text(page: fitz.Page, x: float, y: float, text: str, size: float = 9, bold: bool = False):
+    page.insert_text((x, y), text, fontsize=size, fontname="hebo" if bold else "helv")
+
+def _wrap(text: str, width: float, size: float = 9) -> List[str]:
+    """Split `text` into lines no wider than `width` points, like a description cell"""
+    lines: List[str] = []
+    for word in text.split():
+        if lines and fitz.get_text_length(f"{lines[-1]} {word}", fontname="helv", fontsize=size) <= width:
+            lines[-1] = f"{lines[-1]} {word}"
+        else:
+            lines.append(word)
+    return lines
+
+def _items_header(page: fitz.Page, y: float):
+    page.draw_rect(fitz.Rect(35, y - 14, 560, y + 8), color=None, fill=(0.93, 0.93, 0.93))
+    for x, label in ITEM_HEADER:
+        _text(page, x, y, label, bold=True)
+
+def generate_invoice(items: int = 3, extra_pages: int = 0, seed: Optional[int] = 0) -> bytes:
+    """Build a text-layer invoice PDF with `items` line items (plus `extra_pages` blank-ish annex pages)"""
+    rng = random.Random(seed)
+    doc = fitz.open()
+    page = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+
+    # Header, CLIENT block, date / plate / mileage
+    _text(page, 46, 60, "SPEEDMECAHOME", size=16, bold=True)
+    _text(page, 46, 74, "VENTE PIÈCES DE RECHANGES, ENTRETIEN,", size=7)
+    _text(page, 461, 56, "FACTURE", size=16, bold=True)
+    _text(page, 472, 77, f"N° FAC-{rng.randint(1, 999999):06d}")
+    _text(page, 46, 153, "CLIENT", size=12)
+    _text(page, 46, 169, rng.choice(CLIENTS), size=10)
+    _text(page, 50, 185, f"M/F {rng.randint(1000000, 9999999)} F A M 000")
+    _text(page, 50, 199, f"Email : contact{rng.randint(1, 99)}@client-{rng.randint(1, 99)}.tn")
+    _text(page, 50, 211, f"Mobile : +216{rng.randint(20000000, 99999999)}")
+    invoice_date = date(2024, 1, 1) + timedelta(days=rng.randint(0, 365))
+    _text(page, 393, 151, f"Date {invoice_date.strftime('%d-%m-%Y')}")
+    _text(page, 393, 166, f"{rng.randint(1, 250)} TU {rng.randint(1000, 9999)}")
+    _text(page, 393, 190, f"{rng.randint(10000, 300000)} KM")
+
+    # Items table, flowing onto new pages when full
+    _items_header(page, 277)
+    _text(page, 43, 305, f"BL-{rng.randint(1, 999999):06d}", size=11)
+    y = ITEMS_TOP
+    subtotal = 0.0
+    for number in range(1, items + 1):
+        if y > ITEMS_BOTTOM:
+            page = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+            _items_header(page, 80)
+            y = 110
+        quantity = rng.randint(1, 4)
+        unit_price = round(rng.uniform(5, 400), 3)
+        total = round(quantity * unit_price, 3)
+        subtotal += total
+        row = [str(number), rng.choice(PARTS), str(quantity), money(unit_price), "19 %", money(total)]
+        for x, value in zip(ITEM_COLUMNS_X, row):
+            if x == ITEM_COLUMNS_X[1]:
+                # Long part names wrap within the Description column instead of running into Quantité
+                for line_index, line in enumerate(_wrap(value, ITEM_COLUMNS_X[2] - x - 4)):
+                    _text(page, x, y + 10 * line_index, line)
+            else:
+                _text(page, x, y, value)
+        y += ITEM_ROW_HEIGHT
+
+    # Totals block right below the table (new page if it doesn't fit)
+    if y > ITEMS_BOTTOM - 150:
+        page = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+        y = 100
+    vat = round(subtotal * 0.19, 3)
+    stamp = 1.0
+    _text(page, 335, y + 5, "SOUS-TOTAL HT :", size=10)
+    _text(page, 477, y + 5, money(subtotal), size=10)
+    _text(page, 170, y + 45, "TVA      Base      Montant", bold=True)
+    _text(page, 164, y + 70, f"19 %   {money(subtotal)}   {money(vat)}")
+    for offset, label, value in [(42, "TOTAL HT", subtotal), (64, "BASE TVA", subtotal),
+                                 (86, "TOTAL TVA", vat), (109, "Timbre fiscal", stamp)]:
+        _text(page, 358, y + offset, label)
+        _text(page, 455, y + offset, money(value))
+    _text(page, 374, y + 164, "NET À PAYER", size=11, bold=True)
+    _text(page, 460, y + 164, money(subtotal + vat + stamp), size=11, bold=True)
+    _text(page, 27, y + 187, "Arrêtée la présente facture à la somme de :")
+    _text(page, 27, y + 200, "montant en toutes lettres")
+
+    for _ in range(extra_pages):
+        annex = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+        _text(annex, 46, 80, "CONDITIONS GÉNÉRALES", size=12, bold=True)
+        for line in range(30):
+            _text(annex, 46, 110 + line * 14, "Les pièces remplacées restent à la disposition du client.")
+
+    # Supplier footer on every page
+    for footer_page in doc:
+        _text(footer_page, 27, 750, "SPEEDMECAHOME")
+        _text(footer_page, 27, 762, "Route X20")
+        _text(footer_page, 27, 775, "2091 jardin d'el menzah 2 +21629097633")
+        _text(footer_page, 27, 787, "Code TVA : 1755825 N A M 000")
+        _text(footer_page, 375, 750, "INFORMATIONS BANCAIRES")
+        _text(footer_page, 375, 775, "IBAN TN59 3201 8788 1161 5185 2185")
+        _text(footer_page, 279, 800, f"Page {footer_page.number + 1} / {doc.page_count}")
+
+    pdf = doc.tobytes(garbage=3, deflate=True)
+    doc.close()
+    return pdf
+
+def scanned_variant(pdf: bytes, dpi: int = 200, noise: float = 0.0, skew: float = 0.0,
+                    seed: Optional[int] = 0) -> bytes:
+    """Rasterize every page into an image-only PDF (no text layer)
+
+    `noise` (0-1) adds speckle and blur, `skew` rotates pages by up to that many degrees.
+    """
+    rng = random.Random(seed)
+    source = fitz.open(stream=pdf, filetype="pdf")
+    scanned = fitz.open()
+    for page in source:
+        pix = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY, alpha=False)
+        image = Image.frombytes("L", (pix.width, pix.height), pix.samples)
+        if skew:
+            image = image.rotate(rng.uniform(-skew, skew), expand=False, fillcolor=255)
+        if noise:
+            speckle = Image.effect_noise(image.size, 255 * noise).point(lambda v: 0 if v < 40 else 255)
+            image = Image.composite(image, speckle, speckle)
+            image = image.filter(ImageFilter.GaussianBlur(radius=noise * 1.5))
+        buffer = io.BytesIO()
+        image.save(buffer, format="PNG")
+        out_page = scanned.new_page(width=page.rect.width, height=page.rect.height)
+        out_page.insert_image(out_page.rect, stream=buffer.getvalue())
+    source.close()
+    data = scanned.tobytes(garbage=3, deflate=True)
+    scanned.close()
+    return data
+
+def corpus(cases: List[Tuple[str, int, int, bool, float]], seed: int = 0) -> List[Tuple[str, bytes]]:
+    """Build (name, pdf) pairs from (name, items, extra_pages, scanned, noise) specs"""
+    documents = []
+    for index, (name, items, extra_pages, scanned, noise) in enumerate(cases):
+        pdf = generate_invoice(items, extra_pages, seed=seed + index)
+        if scanned:
+            pdf = scanned_variant(pdf, noise=noise, skew=2.0 * noise, seed=seed + index)
+        documents.append((name, pdf))
+    return documents
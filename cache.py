@@ -0,0 +1,223 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
+
+import config
+from models import ExtractionResponse
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+# Modules and settings whose changes can change an extraction result
+_FINGERPRINT_MODULES = ["extractor.py", "tables.py", "pdf_processor.py", "templates.py", "document.py", "models.py", "pipeline.py", "ocr_engine.py", "preprocess.py"]
+_FINGERPRINT_SETTINGS = ["OCR_DPI", "OCR_GRAYSCALE", "OCR_TEMPLATE", "MIN_PAGE_TEXT_CHARS", "OCR_ENGINE", "OCR_PREPROCESS", "OCR_TARGET_TEXT_HEIGHT", "OCR_START_DPI", "OCR_MIN_CONFIDENCE", "OCR_MIN_AMOUNT_CONFIDENCE", "OCR_PIXEL_BUDGET"]
+
+def pipeline_fingerprint() -> str:
+    """Hash of the extraction code and settings, so any change invalidates old results"""
+    digest = hashlib.sha256()
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    for name in _FINGERPRINT_MODULES:
+        path = os.path.join(base_dir, name)
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+    for name in _FINGERPRINT_SETTINGS:
+        digest.update(f"{name}={getattr(config, name)}".encode())
+    return digest.hexdigest()[:16]
+
+class ResultCache:
+    """Extraction results keyed by PDF content hash + pipeline fingerprint
+
+    Two tiers: a bounded in-memory LRU, and JSON files under `directory` that
+    survive restarts (pruned to `max_disk_entries`, least recently used first).
+    """
+
+    def __init__(self, max_entries: int = config.RESULT_CACHE_ENTRIES,
+                 directory: Optional[str] = config.RESULT_CACHE_DIR,
+                 max_disk_entries: int = config.RESULT_CACHE_DISK_ENTRIES):
+        self.max_entries = max_entries
+        self.directory = directory or None
+        self.max_disk_entries = max_disk_entries
+        self.fingerprint = pipeline_fingerprint()
+        self._memory: "OrderedDict[str, ExtractionResponse]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes_since_prune = 0
+        self.counters: Dict[str, int] = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0}
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+
+    def key(self, content: bytes) -> str:
+        return f"{hashlib.sha256(content).hexdigest()}-{self.fingerprint}"
+
+    def lookup(self, content: bytes) -> Tuple[str, Optional[ExtractionResponse]]:
+        """Hash the PDF and return (key, cached response or None)"""
+        key = self.key(content)
+        return key, self.get(key)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key: str) -> Optional[ExtractionResponse]:
+        with self._lock:
+            response = self._memory.get(key)
+            if response is not None:
+                self._memory.move_to_end(key)
+                self.counters["memory_hits"] += 1
+                return response
+
+        if self.directory:
+            try:
+                with open(self._path(key), 'r', encoding='utf-8') as f:
+                    response = ExtractionResponse.parse_raw(f.read())
+            except (OSError, ValueError):
+                response = None
+            if response is not None:
+                # Refresh mtime so disk pruning evicts least recently used first
+                try:
+                    os.utime(self._path(key))
+                except OSError:
+                    pass
+                self._remember(key, response)
+                with self._lock:
+                    self.counters["disk_hits"] += 1
+                return response
+
+        with self._lock:
+            self.counters["misses"] += 1
+        return None
+
+    def put(self, key: str, response: ExtractionResponse):
+        # Failures may be transient (worker crash, timeout); only keep real results
+        if not response.success:
+            return
+        self._remember(key, response)
+        with self._lock:
+            self.counters["stores"] += 1
+
+        if self.directory:
+            path = self._path(key)
+            temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            try:
+                with open(temp_path, 'w', encoding='utf-8') as f:
+                    f.write(response.json())
+                os.replace(temp_path, path)
+            except OSError as e:
+                print(f"Error writing result cache entry: {e}")
+                return
+
+            self._writes_since_prune += 1
+            if self._writes_since_prune >= 100:
+                self._writes_since_prune = 0
+                self._prune_disk()
+
+    def _remember(self, key: str, response: ExtractionResponse):
+        with self._lock:
+            self._memory[key] = response
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def _prune_disk(self):
+        entries = [entry for entry in os.scandir(self.directory) if entry.name.endswith('.json')]
+        if len(entries) <= self.max_disk_entries:
+            return
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in entries[:len(entries) - self.max_disk_entries]:
+            try:
+                os.unlink(entry.path)
+            except OSError:
+                pass
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.counters, memory_entries=len(self._memory))
+
+class OCRTextCache:
+    """OCR text of single rendered pages/zones, keyed by the image pixels and OCR settings
+
+    Lets re-saved or re-signed PDFs with pixel-identical scans skip tesseract.
+    Stored in SQLite so every worker process shares it; total text size is kept
+    under `max_bytes` by evicting least recently used entries.
+    """
+
+    def __init__(self, path: str = config.OCR_CACHE_PATH, max_bytes: int = config.OCR_CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._puts_since_evict = 0
+        self._lock = threading.Lock()
+        self.counters: Dict[str, int] = {"hits": 0, "misses": 0}
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connection()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS ocr_pages (
+                key TEXT PRIMARY KEY,
+                text TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS ocr_pages_last_used ON ocr_pages (last_used)")
+        conn.execute("PRAGMA journal_mode=WAL")
+
+    def _connection(self) -> sqlite3.Connection:
+        # One connection per OCR thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def key(image: Image.Image, lang: str, dpi: Optional[int], tesseract_config: str) -> str:
+        digest = hashlib.sha256()
+        digest.update(f"{image.mode}:{image.size}:{lang}:{dpi}:{tesseract_config}".encode())
+        digest.update(image.tobytes())
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        try:
+            conn = self._connection()
+            row = conn.execute("SELECT text FROM ocr_pages WHERE key = ?", (key,)).fetchone()
+            if row:
+                conn.execute("UPDATE ocr_pages SET last_used = ? WHERE key = ?", (time.time(), key))
+        except sqlite3.Error as e:
+            print(f"Error reading OCR cache: {e}")
+            row = None
+        with self._lock:
+            self.counters["hits" if row else "misses"] += 1
+        return row[0] if row else None
+
+    def put(self, key: str, text: str):
+        try:
+            self._connection().execute(
+                "INSERT OR REPLACE INTO ocr_pages (key, text, size, last_used) VALUES (?, ?, ?, ?)",
+                (key, text, len(text.encode('utf-8')), time.time())
+            )
+            self._puts_since_evict += 1
+            if self._puts_since_evict >= 20:
+                self._puts_since_evict = 0
+                self._evict()
+        except sqlite3.Error as e:
+            print(f"Error writing OCR cache: {e}")
+
+    def _evict(self):
+        conn = self._connection()
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM ocr_pages").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        stale = []
+        for key, size in conn.execute("SELECT key, size FROM ocr_pages ORDER BY last_used"):
+            if total <= self.max_bytes:
+                break
+            stale.append((key,))
+            total -= size
+        conn.executemany("DELETE FROM ocr_pages WHERE key = ?", stale)
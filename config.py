@@ -0,0 +1,121 @@
+import os
+
+# Runtime settings, read from the environment (see render.yaml)
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() not in ("0", "false", "no", "off", "")
+
+def _available_cpus() -> int:
+    # Respects container CPU affinity where the platform supports it
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+# Worker processes running the PDF -> InvoiceModel pipeline.
+# 0 runs the pipeline in a thread of the API process instead (local development).
+WORKER_PROCESSES = _env_int("WORKER_PROCESSES", _available_cpus())
+
+# Extractions allowed to wait for a free worker before new uploads are rejected
+MAX_PENDING_EXTRACTIONS = _env_int("MAX_PENDING_EXTRACTIONS", 2 * max(WORKER_PROCESSES, 1))
+
+# Seconds clients are told to wait (Retry-After) when the pool is saturated
+RETRY_AFTER_SECONDS = _env_int("RETRY_AFTER_SECONDS", 5)
+
+# Warm up fitz and tesseract in every worker at startup; /ready answers 503 until done
+WARMUP_ON_STARTUP = _env_bool("WARMUP_ON_STARTUP", False)
+
+# Asynchronous extraction jobs (POST /jobs), persisted in a local SQLite file
+JOBS_DB_PATH = os.environ.get("JOBS_DB_PATH", "jobs.db")
+JOB_WORKERS = _env_int("JOB_WORKERS", max(WORKER_PROCESSES, 1))
+JOB_POLL_SECONDS = _env_int("JOB_POLL_SECONDS", 5)
+JOB_RETENTION_HOURS = _env_int("JOB_RETENTION_HOURS", 24)
+# How often idle job workers delete finished jobs older than the retention
+JOB_PURGE_SECONDS = _env_int("JOB_PURGE_SECONDS", 600)
+
+# Largest PDF accepted, including each PDF inside a batch zip
+MAX_UPLOAD_BYTES = _env_int("MAX_UPLOAD_BYTES", 20 * 1024 * 1024)
+
+# Uploads are read in chunks of this size, so oversized files are cut off early
+UPLOAD_CHUNK_BYTES = _env_int("UPLOAD_CHUNK_BYTES", 1024 * 1024)
+
+# PDFs with more pages than this are rejected before any extraction work
+MAX_PDF_PAGES = _env_int("MAX_PDF_PAGES", 50)
+
+# Documents of one /extract-invoices batch processed at the same time
+BATCH_CONCURRENCY = _env_int("BATCH_CONCURRENCY", max(WORKER_PROCESSES, 1))
+
+# OCR rasterization: DPI of rendered pages and whether to render them in grayscale
+OCR_DPI = _env_int("OCR_DPI", 200)
+OCR_GRAYSCALE = _env_bool("OCR_GRAYSCALE", True)
+
+# Pages of one document OCR'd in parallel, and tesseract runs allowed at once
+# across every worker process of the instance
+OCR_THREADS = _env_int("OCR_THREADS", min(4, _available_cpus()))
+OCR_MAX_CONCURRENCY = _env_int("OCR_MAX_CONCURRENCY", _available_cpus())
+# Seconds an image waits for one of those tesseract slots before its page is given up
+OCR_SLOT_TIMEOUT = _env_int("OCR_SLOT_TIMEOUT", 120)
+
+# OCR backend: "tesserocr" keeps libtesseract and its language model loaded in
+# each OCR thread, "pytesseract" starts one tesseract process per image, "auto"
+# uses tesserocr when it is installed
+OCR_ENGINE = os.environ.get("OCR_ENGINE", "auto")
+
+# Image clean-up between rendering and OCR (see preprocess.py): comma-separated
+# steps among grayscale, binarize, deskew, crop, downscale, or "all"; "" (the
+# default) disables it. downscale shrinks pages whose text lines are taller than
+# OCR_TARGET_TEXT_HEIGHT pixels
+OCR_PREPROCESS = os.environ.get("OCR_PREPROCESS", "")
+OCR_TARGET_TEXT_HEIGHT = _env_int("OCR_TARGET_TEXT_HEIGHT", 40)
+
+# Memory bounds of one document's OCR: images alive at once (a template zone
+# counts as one), and their total pixels, from OCR_MEMORY_MB at ~7 bytes per
+# pixel (~17 with binarize). Each busy OCR thread's model (~45 MB) comes on top
+OCR_PAGES_IN_FLIGHT = _env_int("OCR_PAGES_IN_FLIGHT", OCR_THREADS)
+OCR_MEMORY_MB = _env_int("OCR_MEMORY_MB", 128)
+OCR_BYTES_PER_PIXEL = 17 if "binarize" in OCR_PREPROCESS or OCR_PREPROCESS.strip().lower() == "all" else 7
+OCR_PIXEL_BUDGET = _env_int("OCR_PIXEL_BUDGET", OCR_MEMORY_MB * 1024 * 1024 // OCR_BYTES_PER_PIXEL)
+
+# Adaptive DPI: with OCR_START_DPI set (e.g. 150), whole pages are OCR'd at that
+# DPI first and rendered again at OCR_DPI only when the mean word confidence, or
+# the mean over amount-like words, is under these thresholds (template zones keep
+# their own DPI). Off by default: on the synthetic benchmark scans (eng model) a
+# 150 DPI pass is only ~15% cheaper than 200, and thresholds strict enough not to
+# lose words send the dense annex pages to a second pass anyway
+OCR_START_DPI = _env_int("OCR_START_DPI", 0)
+OCR_MIN_CONFIDENCE = _env_int("OCR_MIN_CONFIDENCE", 85)
+OCR_MIN_AMOUNT_CONFIDENCE = _env_int("OCR_MIN_AMOUNT_CONFIDENCE", 80)
+
+# Pages whose fitz text layer has fewer characters than this are OCR'd instead
+MIN_PAGE_TEXT_CHARS = _env_int("MIN_PAGE_TEXT_CHARS", 50)
+
+# Reject documents without any invoice marker (first-page text, metadata or a
+# low-DPI OCR of the brand line, then of the whole first page) before full extraction
+PRESCREEN_ENABLED = _env_bool("PRESCREEN_ENABLED", True)
+# DPI of that whole-page OCR, run only when the brand line OCR misses
+PRESCREEN_PAGE_DPI = _env_int("PRESCREEN_PAGE_DPI", 150)
+
+# Layout template for zone OCR of the first page (see templates.py); "none" OCRs whole pages
+OCR_TEMPLATE = os.environ.get("OCR_TEMPLATE", "speedmecahome")
+
+# Extraction result cache: in-memory LRU entries, on-disk directory ("" disables) and its size
+RESULT_CACHE_ENTRIES = _env_int("RESULT_CACHE_ENTRIES", 256)
+RESULT_CACHE_DIR = os.environ.get("RESULT_CACHE_DIR", ".cache/results")
+RESULT_CACHE_DISK_ENTRIES = _env_int("RESULT_CACHE_DISK_ENTRIES", 10000)
+
+# Per-page OCR text cache shared by the worker processes ("" disables) and its size bound
+OCR_CACHE_PATH = os.environ.get("OCR_CACHE_PATH", ".cache/ocr.db")
+OCR_CACHE_MAX_BYTES = _env_int("OCR_CACHE_MAX_BYTES", 64 * 1024 * 1024)
+
+# Opt-in per-request profiling of /extract-invoice (?profile=1 or X-Profile: 1)
+# and the sampling interval of the profiler in milliseconds
+PROFILING_ENABLED = _env_bool("PROFILING_ENABLED", False)
+PROFILE_INTERVAL_MS = _env_int("PROFILE_INTERVAL_MS", 5)
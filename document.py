@@ -0,0 +1,61 @@
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence, Tuple
+
+def normalize_lines(text: str) -> List[str]:
+    """Split text into stripped lines, the form every line-based extractor works on"""
+    return [line.strip() for line in text.split('\n')]
+
+class DocumentContext:
+    """Per-page text of one PDF, built once and shared by every pipeline stage"""
+
+    def __init__(self, source: Optional[str] = None):
+        self.source = source
+        self.pages: List[str] = []
+        self.methods: List[str] = []  # "fitz" or "ocr", one entry per page
+        # fitz word boxes (x0, y0, x1, y1, word, block, line, word_no) per page; None for OCR'd pages
+        self.words: List[Optional[Sequence[Tuple]]] = []
+        self.timings: Dict[str, float] = {}
+        # Individual durations of repeated steps (e.g. "ocr_page", one per OCR'd page)
+        self.samples: Dict[str, List[float]] = {}
+        self._text: Optional[str] = None
+        self._lines: Optional[List[str]] = None
+
+    def add_page(self, text: str, method: str, words: Optional[Sequence[Tuple]] = None):
+        self.pages.append(text)
+        self.methods.append(method)
+        self.words.append(words)
+        self._text = None
+        self._lines = None
+
+    @property
+    def text(self) -> str:
+        """Full document text, joined the same way the old string API did"""
+        if self._text is None:
+            self._text = "".join(page + "\n" for page in self.pages)
+        return self._text
+
+    @property
+    def lines(self) -> List[str]:
+        """Normalized lines of `text`, built once and shared by the extractors"""
+        if self._lines is None:
+            self._lines = normalize_lines(self.text)
+        return self._lines
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time a block and accumulate it under `name` in `timings` (seconds)"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = self.timings.get(name, 0.0) + time.perf_counter() - start
+
+    def record(self, name: str, seconds: float):
+        """Add one duration of a repeated step to `samples`"""
+        self.samples.setdefault(name, []).append(seconds)
+
+    def stats(self) -> Dict:
+        """Timings, samples and per-page methods, small and picklable for the API process"""
+        return {"timings": dict(self.timings), "samples": {name: list(values) for name, values in self.samples.items()},
+                "methods": list(self.methods)}
@@ -1,9 +1,71 @@
 import re
 from datetime import datetime
+from typing import List, Optional, Union
 from models import InvoiceModel, InvoiceItem, VATBreakdown
+from document import DocumentContext, normalize_lines
+from tables import extract_items_from_words
 
-def extract_speedmechome_invoice(text: str) -> InvoiceModel:
-    lines = text.split('\n')
+# Field patterns, compiled once at import instead of per line
+EMAIL_RE = re.compile(r'[\w\.-]+@[\w\.-]+\.\w+')
+MOBILE_RE = re.compile(r'(\+?\d{2,}[\s\d-]+)')
+DATE_RE = re.compile(r'Date\s+(\d{2}-\d{2}-\d{4})')
+INVOICE_NUMBER_RE = re.compile(r'BL-\d+')
+PLATE_RE = re.compile(r'(\d{1,4}\s*[A-Z]{1,3}\s*\d{1,4})')
+MILEAGE_RE = re.compile(r'(\d+)\s*KM')
+ITEM_LINE_RE = re.compile(r'^\d+\s+')
+WHITESPACE_RE = re.compile(r'\s+')
+QUANTITY_RE = re.compile(r'^\d+$')
+PRICE_DT_RE = re.compile(r'[\d,]+\.?\d*\s*DT')
+PRICE_RE = re.compile(r'^\d+[,.]\d+$')
+NUMBER_RE = re.compile(r'^\d+[,.]?\d*$')
+PERCENT_RE = re.compile(r'^\d+\s*%$')
+
+# Financial amounts are searched at most this many characters after their keyword
+AMOUNT_WINDOW = 160
+AMOUNT = r'([\d,]+\.?\d*)'
+
+# Per field, (keyword, pattern matched at the start of the window after the keyword),
+# tried in order; the first keyword occurrence whose window matches wins
+FINANCIAL_RULES = {
+    'subtotal_ht': [
+        ('SOUS-TOTAL HT', re.compile(r'\s*:?\s*' + AMOUNT + r'\s*DT', re.IGNORECASE)),
+        ('SOUS-TOTAL HT', re.compile(r'.*?' + AMOUNT, re.IGNORECASE | re.DOTALL)),
+        ('SOUS-TOTAL', re.compile(r'.*?' + AMOUNT + r'\s*DT', re.IGNORECASE | re.DOTALL))
+    ],
+    'total_ht': [
+        ('TOTAL HT', re.compile(r'\s+' + AMOUNT + r'\s*DT', re.IGNORECASE)),
+        ('TOTAL HT', re.compile(r'.*?' + AMOUNT, re.IGNORECASE | re.DOTALL))
+    ],
+    'total_vat': [
+        ('TOTAL TVA', re.compile(r'\s+' + AMOUNT + r'\s*DT', re.IGNORECASE)),
+        ('TVA', re.compile(r'.*?' + AMOUNT + r'\s*DT', re.IGNORECASE | re.DOTALL))
+    ],
+    'fiscal_stamp': [
+        ('Timbre fiscal', re.compile(r'\s+' + AMOUNT + r'\s*DT', re.IGNORECASE)),
+        ('Timbre', re.compile(r'.*?' + AMOUNT + r'\s*DT', re.IGNORECASE | re.DOTALL))
+    ],
+    'total_ttc': [
+        ('NET À PAYER', re.compile(r'.*?' + AMOUNT + r'\s*DT', re.IGNORECASE | re.DOTALL)),
+        ('NET À PAYER', re.compile(r'\s+' + AMOUNT + r'\s*DT', re.IGNORECASE)),
+        ('TOTAL', re.compile(r'.*?' + AMOUNT + r'\s*DT', re.IGNORECASE | re.DOTALL))
+    ]
+}
+VAT_RATE_RE = re.compile(r'(\d+)\s*$')
+VAT_AMOUNTS_RE = re.compile(r'\s*' + AMOUNT + r'\s*DT\s*' + AMOUNT + r'\s*DT')
+
+# Case-sensitive anchors; every other keyword is matched ignoring case
+_CASE_SENSITIVE_KEYWORDS = {'%', 'Arrêtée la présente facture'}
+
+def extract_speedmechome_invoice(source: Union[str, DocumentContext]) -> InvoiceModel:
+    if isinstance(source, DocumentContext):
+        with source.stage("extract"):
+            return _extract_from_text(source.text, source.lines, source.words)
+    return _extract_from_text(source)
+
+def _extract_from_text(text: str, lines: Optional[List[str]] = None,
+                       words: Optional[list] = None) -> InvoiceModel:
+    if lines is None:
+        lines = normalize_lines(text)
     
     # Initialize with empty values that will be filled by extraction
     data = {
@@ -18,120 +80,168 @@ def extract_speedmechome_invoice(text: str) -> InvoiceModel:
         'items': []
     }
     
-    # Extract all fields systematically
-    extract_client_info(lines, data)
-    extract_invoice_metadata(lines, data)
-    extract_vehicle_info(lines, data)
-    extract_line_items(text, data)
+    # Client, metadata, vehicle and line items in a single pass over the lines
+    FieldScanner(lines, data).scan()
     extract_financial_data(text, data)
     
+    # Pages with a text layer give word positions: rebuild the items table by column
+    if words and any(words):
+        items = extract_items_from_words(words)
+        if items:
+            data['items'] = items
+    
     # Validate and set defaults for any missing required fields
     ensure_required_fields(data)
     
     return InvoiceModel(**data)
 
-def extract_client_info(lines: list, data: dict):
-    """Extract client information from the invoice"""
-    for i, line in enumerate(lines):
-        line = line.strip()
+class FieldScanner:
+    """Single pass over the normalized (stripped) lines, dispatching each line to the field handlers
+    
+    Handlers check a cheap substring guard before running their precompiled
+    pattern, and only ever look a bounded number of lines ahead, so the cost
+    grows linearly with the document.
+    """
+    
+    def __init__(self, lines: List[str], data: dict):
+        self.lines = lines
+        self.data = data
+        self.items: List[InvoiceItem] = []
+        self.items_state = 'before'  # 'before' -> 'in' -> 'done'
+        self.handlers = [
+            self.scan_client_info,
+            self.scan_invoice_metadata,
+            self.scan_vehicle_info,
+            self.scan_line_items,
+        ]
+    
+    def scan(self):
+        for i, line in enumerate(self.lines):
+            for handler in self.handlers:
+                handler(i, line)
+        self.data['items'] = self.items
+    
+    def scan_client_info(self, i: int, line: str):
+        """Extract client information from the invoice"""
+        data = self.data
         
         # Client name - after CLIENT header
-        if 'CLIENT' in line and i + 1 < len(lines):
-            data['client_name'] = lines[i + 1].strip()
+        if 'CLIENT' in line and i + 1 < len(self.lines):
+            data['client_name'] = self.lines[i + 1]
         
         # MF code - look for MF pattern
         if 'MF' in line and any(char.isdigit() for char in line):
-            data['client_mf'] = line.strip()
+            data['client_mf'] = line
         
         # Email - look for email pattern
-        email_match = re.search(r'[\w\.-]+@[\w\.-]+\.\w+', line)
-        if email_match and 'client_email' not in data:
-            data['client_email'] = email_match.group(0)
+        if '@' in line and 'client_email' not in data:
+            email_match = EMAIL_RE.search(line)
+            if email_match:
+                data['client_email'] = email_match.group(0)
         
         # Mobile - look for phone number pattern
-        mobile_match = re.search(r'(\+?\d{2,}[\s\d-]+)', line)
-        if mobile_match and ('Mobile' in line or 'Tél' in line):
-            data['client_mobile'] = mobile_match.group(0).strip()
-
-def extract_invoice_metadata(lines: list, data: dict):
-    """Extract invoice metadata"""
-    for line in lines:
-        line = line.strip()
-        
+        if 'Mobile' in line or 'Tél' in line:
+            mobile_match = MOBILE_RE.search(line)
+            if mobile_match:
+                data['client_mobile'] = mobile_match.group(0).strip()
+    
+    def scan_invoice_metadata(self, i: int, line: str):
+        """Extract invoice metadata"""
         # Date extraction
-        date_match = re.search(r'Date\s+(\d{2}-\d{2}-\d{4})', line)
-        if date_match:
-            try:
-                data['invoice_date'] = datetime.strptime(date_match.group(1), '%d-%m-%Y')
-            except ValueError:
-                pass
+        if 'Date' in line:
+            date_match = DATE_RE.search(line)
+            if date_match:
+                try:
+                    self.data['invoice_date'] = datetime.strptime(date_match.group(1), '%d-%m-%Y')
+                except ValueError:
+                    pass
         
         # Invoice number
-        bl_match = re.search(r'BL-\d+', line)
-        if bl_match:
-            data['invoice_number'] = bl_match.group(0)
-
-def extract_vehicle_info(lines: list, data: dict):
-    """Extract vehicle information"""
-    for i, line in enumerate(lines):
-        line = line.strip()
-        
+        if 'BL-' in line:
+            bl_match = INVOICE_NUMBER_RE.search(line)
+            if bl_match:
+                self.data['invoice_number'] = bl_match.group(0)
+    
+    def scan_vehicle_info(self, i: int, line: str):
+        """Extract vehicle information"""
         # Vehicle plate - look for pattern like "201 TU 9392"
-        plate_match = re.search(r'(\d{1,4}\s*[A-Z]{1,3}\s*\d{1,4})', line)
-        if plate_match and len(line) < 20:  # Simple length heuristic
-            data['vehicle_plate'] = plate_match.group(0).strip()
-            
-            # Vehicle mileage - typically appears after the plate
-            # Look in current line and next few lines
-            mileage_found = False
-            
-            # Check current line
-            mileage_match = re.search(r'(\d+)\s*KM', line)
+        if len(line) >= 20:  # Simple length heuristic
+            return
+        plate_match = PLATE_RE.search(line)
+        if not plate_match:
+            return
+        self.data['vehicle_plate'] = plate_match.group(0).strip()
+        
+        # Vehicle mileage - typically appears after the plate
+        # Look in current line and next 3 lines
+        for j in range(i, min(i + 4, len(self.lines))):
+            if 'KM' not in self.lines[j]:
+                continue
+            mileage_match = MILEAGE_RE.search(self.lines[j])
             if mileage_match:
-                data['vehicle_mileage'] = mileage_match.group(1) + ' KM'
-                mileage_found = True
-            
-            # Check next 3 lines if not found
-            if not mileage_found:
-                for j in range(i+1, min(i+4, len(lines))):
-                    mileage_match = re.search(r'(\d+)\s*KM', lines[j])
-                    if mileage_match:
-                        data['vehicle_mileage'] = mileage_match.group(1) + ' KM'
-                        mileage_found = True
-                        break
-
-def extract_line_items(text: str, data: dict):
-    """Extract line items from the invoice"""
-    items = []
-    lines = text.split('\n')
+                self.data['vehicle_mileage'] = mileage_match.group(1) + ' KM'
+                break
     
-    # Find the items table section
-    in_items_section = False
-    for i, line in enumerate(lines):
-        line = line.strip()
+    def scan_line_items(self, i: int, line: str):
+        """Extract line items from the invoice"""
+        if self.items_state == 'done':
+            return
         
         # Start of items table
         if 'Description' in line and 'Quantité' in line and 'PU HT' in line:
-            in_items_section = True
-            continue
+            self.items_state = 'in'
+            return
+        
+        if self.items_state != 'in':
+            return
         
         # End of items section
-        if in_items_section and ('SOUS-TOTAL' in line or 'TVA' in line or 'TOTAL' in line):
-            break
+        if 'SOUS-TOTAL' in line or 'TVA' in line or 'TOTAL' in line:
+            self.items_state = 'done'
+            return
         
         # Parse item lines
-        if in_items_section and re.match(r'^\d+\s+', line):
+        if ITEM_LINE_RE.match(line):
             item = parse_item_line(line)
             if item:
-                items.append(item)
+                self.items.append(item)
+
+class KeywordIndex:
+    """Offsets just past each occurrence of the financial keywords, built once per document
+    
+    Each keyword is found with one linear scan; occurrences may overlap
+    (e.g. "TOTAL HT" inside "SOUS-TOTAL HT"), like the old whole-text searches.
+    """
     
-    data['items'] = items
+    def __init__(self, text: str):
+        self.text = text
+        self._offsets = {}
+    
+    def offsets(self, keyword: str) -> List[int]:
+        if keyword not in self._offsets:
+            flags = 0 if keyword in _CASE_SENSITIVE_KEYWORDS else re.IGNORECASE
+            pattern = re.compile(re.escape(keyword), flags)
+            self._offsets[keyword] = [m.end() for m in pattern.finditer(self.text)]
+        return self._offsets[keyword]
+    
+    def window(self, offset: int) -> str:
+        return self.text[offset:offset + AMOUNT_WINDOW]
+    
+    def first_match(self, keyword: str, pattern: re.Pattern) -> Optional[str]:
+        """Amount matched by `pattern` right after the first fitting occurrence of `keyword`"""
+        for offset in self.offsets(keyword):
+            window = self.window(offset)
+            match = pattern.match(window)
+            # An amount touching the window edge may be cut short; don't trust it
+            if match and match.end(1) < len(window):
+                return match.group(1)
+        return None
 
 def parse_item_line(line: str):
     """Parse a single item line with multiple strategies"""
     try:
         # Clean the line
-        line = re.sub(r'\s+', ' ', line.strip())
+        line = WHITESPACE_RE.sub(' ', line.strip())
         
         # Strategy 1: Split by multiple spaces and look for patterns
         parts = [p.strip() for p in line.split('  ') if p.strip()]
@@ -145,10 +255,10 @@ def parse_item_line(line: str):
             
             for part in parts:
                 # Look for quantity (usually a single digit)
-                if re.match(r'^\d+$', part) and len(part) < 3:
+                if QUANTITY_RE.match(part) and len(part) < 3:
                     quantity = float(part)
                 # Look for prices (contain digits and commas)
-                elif re.match(r'[\d,]+\.?\d*\s*DT', part) or re.match(r'^\d+[,.]\d+$', part):
+                elif PRICE_DT_RE.match(part) or PRICE_RE.match(part):
                     price_value = float(part.replace(',', '.').replace(' DT', ''))
                     # First price encountered is usually unit price
                     if unit_price == 0.0:
@@ -156,7 +266,7 @@ def parse_item_line(line: str):
                     else:
                         total_ht = price_value
                 # Description is everything else that's not a number or price
-                elif not re.match(r'^\d+[,.]?\d*$', part) and not re.match(r'^\d+\s*%$', part):
+                elif not NUMBER_RE.match(part) and not PERCENT_RE.match(part):
                     description += ' ' + part
             
             if description and unit_price > 0:
@@ -175,58 +285,46 @@ def parse_item_line(line: str):
     return None
 
 def extract_financial_data(text: str, data: dict):
-    """Extract financial totals and VAT information"""
-    # Extract amounts with multiple pattern attempts
-    patterns = {
-        'subtotal_ht': [
-            r'SOUS-TOTAL HT\s*:?\s*([\d,]+\.?\d*)\s*DT',
-            r'SOUS-TOTAL HT.*?([\d,]+\.?\d*)',
-            r'SOUS-TOTAL.*?([\d,]+\.?\d*)\s*DT'
-        ],
-        'total_ht': [
-            r'TOTAL HT\s+([\d,]+\.?\d*)\s*DT',
-            r'TOTAL HT.*?([\d,]+\.?\d*)'
-        ],
-        'total_vat': [
-            r'TOTAL TVA\s+([\d,]+\.?\d*)\s*DT',
-            r'TVA.*?([\d,]+\.?\d*)\s*DT'
-        ],
-        'fiscal_stamp': [
-            r'Timbre fiscal\s+([\d,]+\.?\d*)\s*DT',
-            r'Timbre.*?([\d,]+\.?\d*)\s*DT'
-        ],
-        'total_ttc': [
-            r'NET À PAYER.*?([\d,]+\.?\d*)\s*DT',
-            r'NET À PAYER\s+([\d,]+\.?\d*)\s*DT',
-            r'TOTAL.*?([\d,]+\.?\d*)\s*DT'
-        ]
-    }
+    """Extract financial totals and VAT information
     
-    for field, field_patterns in patterns.items():
-        for pattern in field_patterns:
-            match = re.search(pattern, text, re.IGNORECASE | re.DOTALL)
-            if match:
+    Amounts are parsed from a bounded window after each keyword of the
+    KeywordIndex, never by scanning the whole document with DOTALL patterns,
+    so the cost stays linear on long, noisy OCR output.
+    """
+    index = KeywordIndex(text)
+    
+    # Extract amounts with multiple rule attempts
+    for field, rules in FINANCIAL_RULES.items():
+        for keyword, pattern in rules:
+            amount = index.first_match(keyword, pattern)
+            if amount is not None:
                 try:
-                    data[field] = float(match.group(1).replace(',', '.'))
+                    data[field] = float(amount.replace(',', '.'))
                     break
                 except ValueError:
                     continue
     
-    # Extract VAT breakdown
-    vat_match = re.search(r'(\d+)\s*%\s*([\d,]+\.?\d*)\s*DT\s*([\d,]+\.?\d*)\s*DT', text)
-    if vat_match:
-        try:
-            rate = float(vat_match.group(1)) / 100
-            base = float(vat_match.group(2).replace(',', '.'))
-            amount = float(vat_match.group(3).replace(',', '.'))
-            data['vat_breakdown'] = [VATBreakdown(rate=rate, base=base, amount=amount)]
-        except ValueError:
-            pass
+    # Extract VAT breakdown - the rate digits just before a "%", then base and amount after it
+    for offset in index.offsets('%'):
+        rate_match = VAT_RATE_RE.search(text, max(0, offset - 1 - AMOUNT_WINDOW), offset - 1)
+        vat_match = VAT_AMOUNTS_RE.match(index.window(offset))
+        if rate_match and vat_match:
+            try:
+                rate = float(rate_match.group(1)) / 100
+                base = float(vat_match.group(1).replace(',', '.'))
+                amount = float(vat_match.group(2).replace(',', '.'))
+                data['vat_breakdown'] = [VATBreakdown(rate=rate, base=base, amount=amount)]
+            except ValueError:
+                pass
+            break
     
-    # Extract amount in words
-    amount_match = re.search(r'Arrêtée la présente facture.*?\n(.*?)(?:\n|$)', text, re.DOTALL)
-    if amount_match:
-        data['amount_in_words'] = amount_match.group(1).strip()
+    # Extract amount in words - the line after the "Arrêtée..." sentence
+    for offset in index.offsets('Arrêtée la présente facture'):
+        line_start = text.find('\n', offset)
+        if line_start != -1:
+            line_end = text.find('\n', line_start + 1)
+            data['amount_in_words'] = text[line_start + 1:line_end if line_end != -1 else len(text)].strip()
+        break
 
 def ensure_required_fields(data: dict):
     """Ensure all required fields have values"""
@@ -0,0 +1,195 @@
+import asyncio
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Awaitable, Callable, Iterator, List, Optional
+
+from pydantic import BaseModel
+
+import config
+from models import ExtractionResponse
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+class JobStatusResponse(BaseModel):
+    job_id: str
+    status: str  # "queued", "running", "done", "failed"
+    created_at: float
+    updated_at: float
+    result: Optional[ExtractionResponse] = None
+    error: Optional[str] = None
+
+class JobStore:
+    """SQLite-backed queue of extraction jobs
+
+    Every method opens its own connection, so the store can be used from
+    worker threads (asyncio.to_thread) without sharing sqlite handles.
+    """
+
+    def __init__(self, path: str = config.JOBS_DB_PATH):
+        self.path = path
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    pdf BLOB,
+                    result TEXT,
+                    error TEXT
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+            conn.execute("PRAGMA journal_mode=WAL")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # Autocommit mode; claim() manages its own transaction
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def submit(self, content: bytes) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, status, created_at, updated_at, pdf) VALUES (?, ?, ?, ?, ?)",
+                (job_id, QUEUED, now, now, content)
+            )
+        return job_id
+
+    def claim(self) -> Optional[tuple]:
+        """Mark the oldest queued job as running and return (job_id, pdf bytes)"""
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT id, pdf FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1", (QUEUED,)
+                ).fetchone()
+                if row:
+                    conn.execute(
+                        "UPDATE jobs SET status = ?, updated_at = ? WHERE id = ?", (RUNNING, time.time(), row[0])
+                    )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return row
+
+    def complete(self, job_id: str, response: ExtractionResponse):
+        with self._connect() as conn:
+            # The PDF is no longer needed once the result is stored
+            conn.execute(
+                "UPDATE jobs SET status = ?, updated_at = ?, result = ?, pdf = NULL WHERE id = ?",
+                (DONE, time.time(), response.json(), job_id)
+            )
+
+    def fail(self, job_id: str, error: str):
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, updated_at = ?, error = ?, pdf = NULL WHERE id = ?",
+                (FAILED, time.time(), error, job_id)
+            )
+
+    def get(self, job_id: str) -> Optional[JobStatusResponse]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT id, status, created_at, updated_at, result, error FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        if not row:
+            return None
+        return JobStatusResponse(
+            job_id=row[0],
+            status=row[1],
+            created_at=row[2],
+            updated_at=row[3],
+            result=ExtractionResponse.parse_raw(row[4]) if row[4] else None,
+            error=row[5]
+        )
+
+    def count(self, status: str) -> int:
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM jobs WHERE status = ?", (status,)).fetchone()[0]
+
+    def requeue_running(self) -> int:
+        """Put jobs interrupted by a restart back in the queue"""
+        with self._connect() as conn:
+            return conn.execute(
+                "UPDATE jobs SET status = ?, updated_at = ? WHERE status = ?", (QUEUED, time.time(), RUNNING)
+            ).rowcount
+
+    def purge_finished(self, older_than_seconds: float) -> int:
+        with self._connect() as conn:
+            return conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?",
+                (DONE, FAILED, time.time() - older_than_seconds)
+            ).rowcount
+
+class JobRunner:
+    """Background tasks that drain the JobStore through `process`
+
+    `process` should wait for pool capacity rather than raise PoolSaturated.
+    """
+
+    def __init__(self, store: JobStore, process: Callable[[bytes], Awaitable[ExtractionResponse]],
+                 workers: int = config.JOB_WORKERS):
+        self.store = store
+        self.process = process
+        self.workers = workers
+        self._wakeup = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+        self._next_purge = 0.0
+
+    async def start(self):
+        requeued = await asyncio.to_thread(self.store.requeue_running)
+        if requeued:
+            print(f"Requeued {requeued} interrupted extraction job(s)")
+        await self._purge()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _purge(self):
+        """Delete finished jobs past JOB_RETENTION_HOURS; runs at start, then every JOB_PURGE_SECONDS while idle"""
+        self._next_purge = time.monotonic() + config.JOB_PURGE_SECONDS
+        await asyncio.to_thread(self.store.purge_finished, config.JOB_RETENTION_HOURS * 3600)
+
+    def notify(self):
+        """Wake idle workers after a new job was submitted"""
+        self._wakeup.set()
+
+    async def _worker(self):
+        while True:
+            # Clear before claiming so a submit racing with an empty claim still wakes us
+            self._wakeup.clear()
+            job = await asyncio.to_thread(self.store.claim)
+            if job is None:
+                if time.monotonic() >= self._next_purge:
+                    await self._purge()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=config.JOB_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            job_id, content = job
+            try:
+                response = await self.process(content)
+                await asyncio.to_thread(self.store.complete, job_id, response)
+            except asyncio.CancelledError:
+                # Shutting down: the job stays "running" and is requeued on next start
+                raise
+            except Exception as e:
+                await asyncio.to_thread(self.store.fail, job_id, f"Processing error: {str(e)}")
@@ -0,0 +1,163 @@
+import threading
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Prometheus text exposition format (version 0.0.4), without a client library
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; covers sub-millisecond regex work up to minute-long OCR of big scans
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelValues = Tuple[str, ...]
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in values]
+
+class Gauge(Metric):
+    """A value read from `callback` at scrape time (queue depth, in-flight requests...)"""
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, callback: Callable[[], float]):
+        super().__init__(name, documentation)
+        self.callback = callback
+
+    def samples(self) -> List[str]:
+        return [f"{self.name} {_format_value(self.callback())}"]
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        # per label set: (cumulative-ready bucket counts, sum)
+        self._series: Dict[LabelValues, Tuple[List[int], float]] = {}
+
+    def observe(self, value: float, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._series.get(key) or ([0] * len(self.buckets), 0.0)
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            self._series[key] = (counts, total + value)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            series = sorted((key, (list(counts), total)) for key, (counts, total) in self._series.items())
+        lines = []
+        for key, (counts, total) in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self._metrics) + "\n"
+
+REGISTRY = Registry()
+
+# Seconds spent per pipeline stage. Stages: upload_read, upload_check, prescreen, fitz,
+# ocr (whole document), ocr_page (one OCR'd page), ocr_retry (a low-confidence
+# low-DPI pass redone at a higher DPI), preprocess_<step> (image clean-up
+# of one page, see preprocess.py), validate (structure check), extract (field
+# extraction) and validate_invoice
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "invoice_stage_seconds", "Time spent in each extraction pipeline stage", ["stage"]
+))
+
+EXTRACTIONS = REGISTRY.register(Counter(
+    "invoice_extractions_total",
+    "Extraction requests by outcome (success, failure, cache_hit, rejected, error, invalid_upload)", ["outcome"]
+))
+
+# OCR fallback rate = documents_total{text_source="ocr"} / sum(documents_total)
+DOCUMENTS = REGISTRY.register(Counter(
+    "invoice_documents_total", "Extracted documents by text source (fitz only, or ocr for at least one page)",
+    ["text_source"]
+))
+PAGES = REGISTRY.register(Counter(
+    "invoice_pages_total", "Extracted pages by text source", ["method"]
+))
+
+def observe_pipeline(stats: Optional[Dict]):
+    """Record the stage timings and page methods reported by pipeline.run_pipeline"""
+    if not stats:
+        return
+    for stage, seconds in stats.get("timings", {}).items():
+        STAGE_SECONDS.observe(seconds, stage=stage)
+    for stage, values in stats.get("samples", {}).items():
+        for seconds in values:
+            STAGE_SECONDS.observe(seconds, stage=stage)
+    methods = stats.get("methods") or []
+    for method in methods:
+        PAGES.inc(method=method)
+    if methods:
+        DOCUMENTS.inc(text_source="ocr" if "ocr" in methods else "fitz")
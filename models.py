@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from datetime import datetime
 
 class InvoiceItem(BaseModel):
@@ -47,4 +47,19 @@ class InvoiceModel(BaseModel):
     total_vat: float
     fiscal_stamp: float
     total_ttc: float
-    amount_in_words: str
\ No newline at end of file
+    amount_in_words: str
+
+class ExtractionResponse(BaseModel):
+    success: bool
+    data: Optional[InvoiceModel] = None
+    errors: List[str] = []
+    warnings: List[str] = []
+    validation_passed: bool = False
+
+class ProfiledExtractionResponse(ExtractionResponse):
+    # SamplingProfiler.report() of the request (see profiler.py)
+    profile: Dict[str, Any] = {}
+
+class BatchExtractionResult(ExtractionResponse):
+    index: int
+    filename: str
@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+import re
+import threading
+from typing import TYPE_CHECKING, Dict, List, NamedTuple, Optional, Tuple
+
+import config
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+_PSM_RE = re.compile(r'^\s*(?:--psm\s+(\d+))?\s*$')
+# Words that look like an amount: "204,351", "1.000", "815,746DT"
+_AMOUNT_WORD_RE = re.compile(r'\d[.,]\d{2,3}(?!\d)')
+
+class OCRResult(NamedTuple):
+    """Recognized text and the (word, confidence 0-100) pairs it was read from"""
+    text: str
+    words: List[Tuple[str, float]]
+
+def low_confidence(words: List[Tuple[str, float]], min_confidence: float = config.OCR_MIN_CONFIDENCE,
+                   min_amount_confidence: float = config.OCR_MIN_AMOUNT_CONFIDENCE) -> Optional[str]:
+    """Why words read by tesseract shouldn't be trusted (mean confidence under the threshold, on
+    all words or on the amounts alone); None if they're fine or there's nothing to judge"""
+    confidences = [confidence for word, confidence in words if word.strip() and confidence >= 0]
+    if not confidences:
+        return None
+    mean = sum(confidences) / len(confidences)
+    if mean < min_confidence:
+        return f"low OCR confidence ({mean:.0f} < {min_confidence:g})"
+    amounts = [confidence for word, confidence in words if confidence >= 0 and _AMOUNT_WORD_RE.search(word)]
+    if amounts:
+        mean = sum(amounts) / len(amounts)
+        if mean < min_amount_confidence:
+            return f"low OCR confidence on amounts ({mean:.0f} < {min_amount_confidence:g})"
+    return None
+
+class PytesseractEngine:
+    """One tesseract process per image: loads the language model every call"""
+    name = "pytesseract"
+
+    def __init__(self, tesseract_cmd: str = '/usr/bin/tesseract'):
+        self.tesseract_cmd = tesseract_cmd
+        self._module = None
+
+    @property
+    def pytesseract(self):
+        """The pytesseract module, imported and pointed at `tesseract_cmd` on first OCR"""
+        if self._module is None:
+            import pytesseract
+            pytesseract.pytesseract.tesseract_cmd = self.tesseract_cmd
+            self._module = pytesseract
+        return self._module
+
+    def image_to_string(self, image: Image.Image, lang: str, tesseract_config: str = "",
+                        dpi: Optional[int] = None) -> str:
+        if dpi:
+            tesseract_config = f"{tesseract_config} --dpi {dpi}".strip()
+        return self.pytesseract.image_to_string(image, lang=lang, config=tesseract_config)
+    
+    def image_to_data(self, image: Image.Image, lang: str, tesseract_config: str = "",
+                      dpi: Optional[int] = None) -> OCRResult:
+        """Text and word confidences from a single tesseract run (its TSV output)"""
+        if dpi:
+            tesseract_config = f"{tesseract_config} --dpi {dpi}".strip()
+        data = self.pytesseract.image_to_data(image, lang=lang, config=tesseract_config,
+                                              output_type=self.pytesseract.Output.DICT)
+        words = []
+        lines: Dict[Tuple[int, int, int], List[str]] = {}
+        for index, word in enumerate(data["text"]):
+            if not word.strip():
+                continue
+            words.append((word, float(data["conf"][index])))
+            line = (data["block_num"][index], data["par_num"][index], data["line_num"][index])
+            lines.setdefault(line, []).append(word)
+        # Same layout as image_to_string: a line per text line, a blank line between paragraphs
+        text_lines, paragraph = [], None
+        for (block, par, _), line_words in lines.items():
+            if paragraph is not None and (block, par) != paragraph:
+                text_lines.append("")
+            text_lines.append(" ".join(line_words))
+            paragraph = (block, par)
+        return OCRResult("\n".join(text_lines) + "\n" if text_lines else "", words)
+
+    def close(self):
+        pass
+
+class TesserocrEngine:
+    """libtesseract in-process through tesserocr, one long-lived API object per thread
+
+    The language model is loaded once per thread instead of once per image,
+    and recognition releases the GIL so OCR threads still run in parallel.
+    tesserocr objects are not thread-safe, hence one per thread (the OCR
+    executor's threads live as long as the process). Must be created on the
+    main thread: importing tesserocr installs signal handlers.
+    """
+    name = "tesserocr"
+
+    def __init__(self, fallback: Optional[PytesseractEngine] = None, lang: Optional[str] = None):
+        import tesserocr
+        if lang:
+            # Checked now rather than on the first page, so a missing model is a startup error
+            path, available = tesserocr.get_languages()
+            missing = [name for name in lang.split('+') if name not in available]
+            if missing:
+                raise RuntimeError(f"no {'+'.join(missing)} language data in {path} (set TESSDATA_PREFIX)")
+        self._tesserocr = tesserocr
+        self._local = threading.local()
+        self._apis: List = []
+        self._lock = threading.Lock()
+        # For tesseract options other than --psm, which the CLI understands and the API doesn't
+        self.fallback = fallback or PytesseractEngine()
+
+    def _api(self, lang: str):
+        apis: Dict[str, object] = getattr(self._local, "apis", None)
+        if apis is None:
+            apis = self._local.apis = {}
+        api = apis.get(lang)
+        if api is None:
+            api = self._tesserocr.PyTessBaseAPI(lang=lang)
+            apis[lang] = api
+            with self._lock:
+                self._apis.append(api)
+        return api
+
+    def _prepare(self, image: Image.Image, lang: str, psm: Optional[str], dpi: Optional[int]):
+        api = self._api(lang)
+        api.SetPageSegMode(int(psm) if psm else self._tesserocr.PSM.AUTO)
+        api.SetImage(image)
+        if dpi:
+            api.SetSourceResolution(dpi)
+        return api
+    
+    def image_to_string(self, image: Image.Image, lang: str, tesseract_config: str = "",
+                        dpi: Optional[int] = None) -> str:
+        match = _PSM_RE.match(tesseract_config)
+        if match is None:
+            return self.fallback.image_to_string(image, lang, tesseract_config, dpi)
+        api = self._prepare(image, lang, match.group(1), dpi)
+        try:
+            return api.GetUTF8Text()
+        finally:
+            api.Clear()
+    
+    def image_to_data(self, image: Image.Image, lang: str, tesseract_config: str = "",
+                      dpi: Optional[int] = None) -> OCRResult:
+        match = _PSM_RE.match(tesseract_config)
+        if match is None:
+            return self.fallback.image_to_data(image, lang, tesseract_config, dpi)
+        api = self._prepare(image, lang, match.group(1), dpi)
+        try:
+            # Both read the same recognition pass
+            text = api.GetUTF8Text()
+            try:
+                words = [(word, float(confidence)) for word, confidence in api.MapWordConfidences()]
+            except RuntimeError:
+                # Raised when nothing was recognized (blank page or zone)
+                words = []
+            return OCRResult(text, words)
+        finally:
+            api.Clear()
+
+    def close(self):
+        with self._lock:
+            apis, self._apis = self._apis, []
+        for api in apis:
+            api.End()
+
+def create_engine(name: str = config.OCR_ENGINE, tesseract_cmd: str = '/usr/bin/tesseract',
+                  lang: Optional[str] = None):
+    """OCR engine for `name`: "tesserocr", "pytesseract", or "auto" (tesserocr when it can be loaded)
+    
+    With `lang`, tesserocr is only used if its language data has every model of it.
+    """
+    name = (name or "auto").lower()
+    fallback = PytesseractEngine(tesseract_cmd)
+    if name == "pytesseract":
+        return fallback
+    try:
+        return TesserocrEngine(fallback, lang)
+    except Exception as e:
+        # ImportError when not installed, RuntimeError for missing language data
+        # or a first import from a non-main thread
+        if name == "tesserocr":
+            raise
+        print(f"⚠ OCR_ENGINE=auto: tesserocr unavailable ({type(e).__name__}: {e}); falling back to "
+              f"pytesseract, which starts a tesseract process (and loads the model) for every image")
+        return fallback
@@ -1,81 +1,537 @@
-import pytesseract
-from pdf2image import convert_from_path
-import fitz
-import tempfile
+from __future__ import annotations
+
+import math
 import os
-from typing import Optional
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from difflib import SequenceMatcher
+from typing import TYPE_CHECKING, BinaryIO, Dict, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+import config
+from document import DocumentContext
+from templates import LayoutTemplate, get_template
+from cache import OCRTextCache
+from ocr_engine import create_engine, low_confidence
+from preprocess import Preprocessor, create_preprocessor
+
+# fitz, PIL and pytesseract are imported on first use: importing them costs more
+# than the rest of the API's startup (see warm_up in pipeline.py)
+if TYPE_CHECKING:
+    import fitz
+    from PIL import Image
+
+# A PDF on disk, its raw bytes, or a binary buffer (e.g. an upload's file object)
+PDFSource = Union[str, bytes, bytearray, memoryview, BinaryIO]
+
+def read_source(source: PDFSource) -> Union[str, bytes]:
+    """Normalize a PDFSource to a path or bytes, reading buffers exactly once"""
+    if isinstance(source, (str, os.PathLike)):
+        return os.fspath(source)
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return bytes(source)
+    return source.read()
+
+def open_pdf(source: PDFSource) -> fitz.Document:
+    """Open a PDF with fitz; bytes and buffers are opened as a stream, never via disk"""
+    import fitz
+    source = read_source(source)
+    if isinstance(source, str):
+        return fitz.open(source)
+    return fitz.open(stream=source, filetype="pdf")
+
+def describe_source(source: PDFSource) -> str:
+    if isinstance(source, (str, os.PathLike)):
+        return os.fspath(source)
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return f"<{len(source)} bytes in memory>"
+    return "<buffer>"
+
+# Caps tesseract runs across the whole instance. Pool workers replace it with a
+# semaphore shared by all processes (see pipeline.init_worker).
+_ocr_slots = threading.BoundedSemaphore(config.OCR_MAX_CONCURRENCY)
+
+class OCRSlotTimeout(RuntimeError):
+    """No tesseract slot freed up within OCR_SLOT_TIMEOUT seconds"""
+
+# Threads fanning one document's pages out to tesseract, created on first use
+_ocr_executor: Optional[ThreadPoolExecutor] = None
+_ocr_executor_lock = threading.Lock()
+
+def set_ocr_slots(slots):
+    """Use `slots` (e.g. a multiprocessing.BoundedSemaphore) as the global OCR cap"""
+    global _ocr_slots
+    _ocr_slots = slots
+
+def _get_ocr_executor() -> ThreadPoolExecutor:
+    global _ocr_executor
+    with _ocr_executor_lock:
+        if _ocr_executor is None:
+            _ocr_executor = ThreadPoolExecutor(max_workers=config.OCR_THREADS, thread_name_prefix="ocr")
+        return _ocr_executor
+
+# Printed in the footer of every page (the header only has the logo image)
+_PRESCREEN_MARKER = "SPEEDMECAHOME"
+# What validate_pdf_structure looks for (it accepts 3 of the 4)
+_INVOICE_MARKERS = (_PRESCREEN_MARKER, "NET À PAYER", "TVA", "DT")
+_MARKER_NOISE_RE = re.compile(r'[^A-Z]')
+
+def _looks_like_marker(text: str) -> bool:
+    """True if a word of `text` (a low-DPI OCR read, or a scanner's text layer) is close to SPEEDMECAHOME (tolerates a couple of misread letters)"""
+    for word in text.upper().replace('0', 'O').split():
+        word = _MARKER_NOISE_RE.sub('', word)
+        if word and SequenceMatcher(None, word, _PRESCREEN_MARKER).ratio() >= 0.75:
+            return True
+    return False
+
+def _has_invoice_marker(text: str) -> bool:
+    """SPEEDMECAHOME (loosely) or any other marker validate_pdf_structure accepts"""
+    return _looks_like_marker(text) or any(marker in text for marker in _INVOICE_MARKERS)
+
+def render_page(page: fitz.Page, dpi: int = config.OCR_DPI, grayscale: bool = config.OCR_GRAYSCALE,
+                clip: Optional[fitz.Rect] = None) -> Image.Image:
+    """Rasterize one page (or the `clip` region of it) in-process with a fitz pixmap, ready to hand to OCR"""
+    import fitz
+    from PIL import Image
+    colorspace = fitz.csGRAY if grayscale else fitz.csRGB
+    pix = page.get_pixmap(dpi=dpi, colorspace=colorspace, alpha=False, clip=clip)
+    mode = "L" if pix.n == 1 else "RGB"
+    return Image.frombytes(mode, (pix.width, pix.height), pix.samples)
+
+def pixel_count(rect: fitz.Rect, dpi: int) -> int:
+    """Pixels of `rect` (in points) rendered at `dpi`, without rendering it"""
+    scale = dpi / 72
+    return round(rect.width * scale) * round(rect.height * scale)
+
+class OCRTask(NamedTuple):
+    """One image to OCR: a whole page, or a template zone of it (`clip`)
+    
+    Rendered at dpis[0] first, then at each next DPI while the OCR confidence is low.
+    """
+    number: int
+    index: int  # position among the page's images, for reassembly in reading order
+    clip: Optional[fitz.Rect]
+    tesseract_config: str
+    dpis: Tuple[int, ...]
 
 class PDFProcessor:
-    def __init__(self, tesseract_cmd: Optional[str] = None):
-        # In production, tesseract should be in system PATH
-        if tesseract_cmd:
-            pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
-        else:
-            # Try to use system tesseract
-            try:
-                pytesseract.pytesseract.tesseract_cmd = '/usr/bin/tesseract'
-            except:
-                # Fallback to whatever is in PATH
-                pass
+    ocr_lang = 'fra+eng'
     
-    def pdf_to_text_with_fitz(self, pdf_path: str) -> str:
-        """Extract text directly from PDF"""
+    def __init__(self, tesseract_cmd: Optional[str] = None,
+                 ocr_dpi: int = config.OCR_DPI, grayscale: bool = config.OCR_GRAYSCALE,
+                 template: Optional[LayoutTemplate] = get_template(config.OCR_TEMPLATE),
+                 use_ocr_cache: bool = bool(config.OCR_CACHE_PATH),
+                 preprocessor: Optional[Preprocessor] = create_preprocessor(config.OCR_PREPROCESS),
+                 start_dpi: int = config.OCR_START_DPI):
+        self.ocr_dpi = ocr_dpi
+        # First-pass DPI for whole pages (adaptive DPI); 0 or >= ocr_dpi OCRs them at ocr_dpi straight away
+        self.start_dpi = start_dpi
+        self.grayscale = grayscale
+        # Known layout whose first page is OCR'd zone by zone instead of whole
+        self.template = template
+        # Pixel-identical pages seen before skip tesseract
+        self.ocr_cache = OCRTextCache() if use_ocr_cache else None
+        # Clean-up applied to every image between rendering and tesseract (None: OCR the raw render)
+        self.preprocessor = preprocessor
+        
+        if config.OCR_THREADS > 1:
+            # Pages already run in parallel; stop each tesseract from also spawning OpenMP threads
+            os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+        
+        # In production, tesseract should be in system PATH (only used by the pytesseract engine)
+        self.tesseract_cmd = tesseract_cmd or '/usr/bin/tesseract'
+        self._ocr_engine = None
+        self._ocr_engine_lock = threading.Lock()
+    
+    @property
+    def ocr_engine(self):
+        """The OCR_ENGINE backend (see ocr_engine.py), created on first OCR"""
+        with self._ocr_engine_lock:
+            if self._ocr_engine is None:
+                self._ocr_engine = create_engine(config.OCR_ENGINE, self.tesseract_cmd, self.ocr_lang)
+            return self._ocr_engine
+    
+    def close(self):
+        """Release the OCR engine; call only once no OCR is running (a later OCR loads a new one)"""
+        with self._ocr_engine_lock:
+            engine, self._ocr_engine = self._ocr_engine, None
+        if engine is not None:
+            engine.close()
+    
+    def run_tesseract(self, image: Image.Image, tesseract_config: str = "", dpi: Optional[int] = None) -> str:
+        """One OCR run, without the OCR cache or the global concurrency cap"""
+        return self.ocr_engine.image_to_string(image, self.ocr_lang, tesseract_config, dpi)
+    
+    def warm_up_ocr(self, image: Image.Image):
+        """Run one OCR on every OCR thread, so each thread's engine has its language model loaded"""
+        if config.OCR_THREADS <= 1:
+            self.run_tesseract(image, "--psm 7")
+            return
+        # The barrier keeps each task on its own thread until all of them have started
+        barrier = threading.Barrier(config.OCR_THREADS)
+        
+        def warm():
+            barrier.wait(timeout=30)
+            return self.run_tesseract(image, "--psm 7")
+        
+        futures = [_get_ocr_executor().submit(warm) for _ in range(config.OCR_THREADS)]
+        for future in futures:
+            future.result()
+    
+    def fitz_pages(self, source: PDFSource) -> List[str]:
+        """Extract the text layer of each page directly from PDF"""
         try:
-            doc = fitz.open(pdf_path)
-            text = ""
-            for page in doc:
-                text += page.get_text() + "\n"
+            doc = open_pdf(source)
+            pages = [page.get_text() for page in doc]
             doc.close()
-            return text
+            return pages
         except Exception as e:
             print(f"Error with direct text extraction: {e}")
-            return ""
+            return []
     
-    def pdf_to_text_with_ocr(self, pdf_path: str) -> str:
-        """Extract text using OCR"""
+    def fitz_layers(self, source: PDFSource) -> List[Tuple[str, list]]:
+        """Text layer and word boxes of each page, read in one pass over the document"""
         try:
-            # Use lower DPI in production to reduce memory usage
-            images = convert_from_path(pdf_path, dpi=200)
-            all_text = ""
-            for image in images:
-                text = pytesseract.image_to_string(image, lang='fra+eng')
-                all_text += text + "\n"
-            return all_text
+            doc = open_pdf(source)
+            layers = [(page.get_text(), page.get_text("words")) for page in doc]
+            doc.close()
+            return layers
         except Exception as e:
-            print(f"Error with OCR extraction: {e}")
-            return ""
+            print(f"Error with direct text extraction: {e}")
+            return []
     
-    def extract_text_from_pdf(self, pdf_path: str, use_ocr: bool = False) -> str:
-        """Main method to extract text from PDF"""
-        print(f"Processing PDF: {pdf_path}")
+    def ocr_image(self, image: Image.Image, tesseract_config: str = "", dpi: Optional[int] = None,
+                  step_timings: Optional[Dict[str, float]] = None) -> str:
+        """OCR one rendered page or zone, waiting for a free slot under the global cap
+        
+        Results are cached by image pixels + OCR settings when the OCR cache is on.
+        The preprocessor runs before the slot is taken (it doesn't need one);
+        seconds per preprocessing step are added to `step_timings` when given.
+        """
+        text, _ = self.ocr_image_checked(image, tesseract_config, dpi, step_timings, check_confidence=False)
+        return text
+    
+    def ocr_image_checked(self, image: Image.Image, tesseract_config: str = "", dpi: Optional[int] = None,
+                          step_timings: Optional[Dict[str, float]] = None,
+                          check_confidence: bool = True) -> Tuple[str, Optional[str]]:
+        """ocr_image that also judges the result: (text, why it shouldn't be trusted or None)
+        
+        With `check_confidence`, tesseract's word confidences are read along with
+        the text (see ocr_engine.low_confidence). Untrusted text isn't cached.
+        """
+        key = None
+        if self.ocr_cache is not None:
+            # Keyed on the raw render, so a hit skips preprocessing too
+            settings = tesseract_config
+            if self.preprocessor is not None:
+                settings = f"{settings}|{self.preprocessor.signature}"
+            if check_confidence:
+                settings = f"{settings}|confidence>={config.OCR_MIN_CONFIDENCE}/{config.OCR_MIN_AMOUNT_CONFIDENCE}"
+            key = OCRTextCache.key(image, self.ocr_lang, dpi, settings)
+            text = self.ocr_cache.get(key)
+            if text is not None:
+                return text, None
+        
+        if self.preprocessor is not None:
+            image, scale = self.preprocessor.run(image, step_timings)
+            if dpi and scale != 1.0:
+                dpi = max(1, round(dpi * scale))
+        
+        reason = None
+        # Bounded wait: a worker killed while holding a slot never gives it back
+        if not _ocr_slots.acquire(timeout=config.OCR_SLOT_TIMEOUT):
+            raise OCRSlotTimeout(f"no OCR slot free after {config.OCR_SLOT_TIMEOUT}s")
+        try:
+            if check_confidence:
+                text, words = self.ocr_engine.image_to_data(image, self.ocr_lang, tesseract_config, dpi)
+                reason = low_confidence(words)
+            else:
+                text = self.run_tesseract(image, tesseract_config, dpi)
+        finally:
+            _ocr_slots.release()
+        
+        if key is not None and reason is None:
+            self.ocr_cache.put(key, text)
+        return text, reason
+    
+    @property
+    def page_dpis(self) -> Tuple[int, ...]:
+        """DPIs to try for a whole page: start_dpi, then ocr_dpi if the OCR confidence is low"""
+        if not self.start_dpi or self.start_dpi >= self.ocr_dpi:
+            return (self.ocr_dpi,)
+        return (self.start_dpi, self.ocr_dpi)
+    
+    def ocr_plan(self, doc: fitz.Document, page_numbers: Optional[List[int]] = None) -> Iterator[OCRTask]:
+        """The images to OCR, in reading order
         
-        # First try direct extraction (faster and uses less memory)
-        if not use_ocr:
-            text = self.pdf_to_text_with_fitz(pdf_path)
-            if text and len(text.strip()) > 100:
-                print("✓ Successfully extracted text directly from PDF")
-                return text
+        With a layout template, the first page is OCR'd zone by zone, each at the
+        zone's DPI and segmentation mode; other pages are OCR'd whole. Zone DPIs
+        are tuned per zone (the brand line is unreadable at 3/4 of its DPI), so
+        only whole pages use the adaptive DPI ladder.
+        """
+        for number in (range(doc.page_count) if page_numbers is None else page_numbers):
+            if self.template is not None and number == 0:
+                page_rect = doc[number].rect
+                for index, zone in enumerate(self.template.zones):
+                    yield OCRTask(number, index, zone.rect(page_rect), zone.tesseract_config, (zone.dpi,))
             else:
-                print("⚠ Direct extraction failed or got little text, falling back to OCR...")
+                yield OCRTask(number, 0, None, "", self.page_dpis)
+    
+    def task_resolution(self, doc: fitz.Document, task: OCRTask, level: int = 0,
+                        pixel_budget: int = config.OCR_PIXEL_BUDGET) -> Tuple[int, int]:
+        """(DPI, pixel count) to render `task` at for pass `level`, lowered when one image alone is over the budget"""
+        dpi = task.dpis[level]
+        rect = task.clip if task.clip is not None else doc[task.number].rect
+        pixels = pixel_count(rect, dpi)
+        if pixel_budget and pixels > pixel_budget:
+            reduced = max(1, int(dpi * math.sqrt(pixel_budget / pixels)))
+            print(f"⚠ Page {task.number + 1} is {pixels} px at {dpi} DPI, over the "
+                  f"{pixel_budget} px budget; rendering it at {reduced} DPI")
+            dpi, pixels = reduced, pixel_count(rect, reduced)
+        return dpi, pixels
+    
+    def _timed_ocr(self, image: Image.Image, tesseract_config: str, dpi: int,
+                   check_confidence: bool) -> Tuple[str, Optional[str], float, Dict[str, float]]:
+        step_timings: Dict[str, float] = {}
+        start = time.perf_counter()
+        text, reason = self.ocr_image_checked(image, tesseract_config, dpi, step_timings, check_confidence)
+        return text, reason, time.perf_counter() - start, step_timings
+    
+    def ocr_pages(self, source: PDFSource, page_numbers: Optional[List[int]] = None,
+                  ctx: Optional[DocumentContext] = None) -> List[str]:
+        """OCR each page of the PDF (or just `page_numbers`), fanning images out to the OCR threads
         
-        # Fall back to OCR
-        print("Using OCR for text extraction...")
-        return self.pdf_to_text_with_ocr(pdf_path)
+        A stream: each image is rendered only when there is room for it and
+        dropped once OCR'd, so at most OCR_PAGES_IN_FLIGHT images totalling
+        OCR_PIXEL_BUDGET pixels are alive at once, whatever the page count. The
+        results keep page (and zone) order. An image whose OCR confidence is
+        low at its first-pass DPI is rendered again at the next DPI of its
+        ladder (on this thread: fitz documents aren't thread-safe) and OCR'd
+        again. With `ctx`, each page's OCR time (zones and retries summed,
+        preprocessing included) is recorded under "ocr_page", the time of each
+        discarded low-DPI pass under "ocr_retry", and each preprocessing step's
+        under "preprocess_<step>". Images that find no tesseract slot within
+        OCR_SLOT_TIMEOUT come back empty, as does the rest of the document.
+        """
+        try:
+            doc = open_pdf(source)
+        except Exception as e:
+            print(f"Error with OCR extraction: {e}")
+            return []
+        try:
+            executor = _get_ocr_executor() if config.OCR_THREADS > 1 else None
+            max_in_flight = max(1, config.OCR_PAGES_IN_FLIGHT)
+            pixel_budget = config.OCR_PIXEL_BUDGET
+            texts: Dict[int, Dict[int, str]] = {}
+            passes: Dict[int, List[Tuple[float, Dict[str, float]]]] = {}
+            in_flight = deque()
+            retries = deque()
+            pixels_in_flight = 0
+            slots_lost = False
+            
+            def collect():
+                nonlocal pixels_in_flight, slots_lost
+                task, level, dpi, pixels, future = in_flight.popleft()
+                try:
+                    text, reason, seconds, step_timings = future.result()
+                except OCRSlotTimeout as e:
+                    # Give up on this image, and don't queue more behind the lost slots
+                    pixels_in_flight -= pixels
+                    slots_lost = True
+                    print(f"⚠ Page {task.number + 1} not OCR'd: {e}")
+                    texts.setdefault(task.number, {})[task.index] = ""
+                    passes.setdefault(task.number, [])
+                    return
+                pixels_in_flight -= pixels
+                passes.setdefault(task.number, []).append((seconds, step_timings))
+                if reason is None:
+                    texts.setdefault(task.number, {})[task.index] = text
+                    return
+                print(f"⚠ {reason[0].upper()}{reason[1:]} on page {task.number + 1} at {dpi} DPI, "
+                      f"retrying at {task.dpis[level + 1]} DPI")
+                if ctx is not None:
+                    ctx.record("ocr_retry", seconds)
+                retries.append((task, level + 1))
+            
+            def submit(task: OCRTask, level: int):
+                nonlocal pixels_in_flight
+                if slots_lost:
+                    texts.setdefault(task.number, {})[task.index] = ""
+                    passes.setdefault(task.number, [])
+                    return
+                dpi, pixels = self.task_resolution(doc, task, level, pixel_budget)
+                # Wait for room before rendering, so the image never exists alongside a full pipeline
+                while in_flight and (len(in_flight) >= max_in_flight or
+                                     (pixel_budget and pixels_in_flight + pixels > pixel_budget)):
+                    collect()
+                image = render_page(doc[task.number], dpi, self.grayscale, clip=task.clip)
+                check_confidence = level + 1 < len(task.dpis)
+                if executor is None:
+                    future = Future()
+                    try:
+                        future.set_result(self._timed_ocr(image, task.tesseract_config, dpi, check_confidence))
+                    except Exception as e:
+                        # Surfaced by collect(), as from an OCR thread
+                        future.set_exception(e)
+                else:
+                    future = executor.submit(self._timed_ocr, image, task.tesseract_config, dpi, check_confidence)
+                pixels_in_flight += pixels
+                # Only the future keeps the image alive now, until its OCR is done
+                del image
+                in_flight.append((task, level, dpi, pixels, future))
+            
+            for task in self.ocr_plan(doc, page_numbers):
+                submit(task, 0)
+                while retries:
+                    submit(*retries.popleft())
+            while in_flight or retries:
+                if retries:
+                    submit(*retries.popleft())
+                else:
+                    collect()
+            
+            pages = []
+            for number in sorted(texts):
+                pages.append("\n".join(texts[number][index] for index in sorted(texts[number])))
+                if ctx is not None:
+                    ctx.record("ocr_page", sum(seconds for seconds, _ in passes[number]))
+                    steps: Dict[str, float] = {}
+                    for _, step_timings in passes[number]:
+                        for step, seconds in step_timings.items():
+                            steps[step] = steps.get(step, 0.0) + seconds
+                    for step, seconds in steps.items():
+                        ctx.record(f"preprocess_{step}", seconds)
+            return pages
+        except Exception as e:
+            print(f"Error with OCR extraction: {e}")
+            return []
+        finally:
+            doc.close()
     
-    def validate_pdf_structure(self, pdf_path: str) -> bool:
-        """Basic validation that this is a SPEEDMECAHOME invoice"""
+    def pdf_to_text_with_fitz(self, source: PDFSource) -> str:
+        """Extract text directly from PDF"""
+        return "".join(page + "\n" for page in self.fitz_pages(source))
+    
+    def pdf_to_text_with_ocr(self, source: PDFSource) -> str:
+        """Extract text using OCR"""
+        return "".join(page + "\n" for page in self.ocr_pages(source))
+    
+    def prescreen(self, source: PDFSource) -> Optional[str]:
+        """Cheap check that this can be a SPEEDMECAHOME invoice, before any full extraction
+        
+        Looks at the first page's text layer and the document metadata; for a
+        scanned first page, OCRs the template's "brand" zone at low DPI and, if
+        that misses (the crop can miss the line on an offset scan or a photo),
+        the whole first page at PRESCREEN_PAGE_DPI. Only rejects what is clearly
+        not an invoice: text is matched as loosely as OCR (scanners'
+        searchable-PDF layers misread the brand too, some layouts have it as an
+        image), and passes on any of the other markers validate_pdf_structure
+        looks for. Returns the rejection reason, or None when the document may
+        be an invoice (including whenever it can't tell, e.g. no template or no OCR).
+        """
+        doc = open_pdf(source)
         try:
-            text = self.extract_text_from_pdf(pdf_path)
+            if doc.page_count == 0:
+                return "the PDF has no pages"
+            page = doc[0]
+            text = page.get_text()
+            metadata = " ".join(value for value in (doc.metadata or {}).values() if isinstance(value, str))
+            if _PRESCREEN_MARKER in text or _PRESCREEN_MARKER in metadata.upper():
+                return None
+            if len(text.strip()) >= config.MIN_PAGE_TEXT_CHARS:
+                if _has_invoice_marker(text):
+                    return None
+                return "none of the invoice markers (SPEEDMECAHOME, NET À PAYER, TVA, DT) on the first page"
+            
+            zone = next((zone for zone in self.template.zones if zone.name == "brand"), None) if self.template else None
+            if zone is None:
+                return None
+            ocr_text = self._prescreen_ocr(render_page(page, zone.dpi, True, clip=zone.rect(page.rect)),
+                                           zone.tesseract_config, zone.dpi)
+            if ocr_text is None or _looks_like_marker(ocr_text):
+                return None
             
-            required_markers = [
-                "SPEEDMECAHOME",
-                "NET À PAYER",
-                "TVA",
-                "DT"
-            ]
+            dpi = config.PRESCREEN_PAGE_DPI
+            ocr_text = self._prescreen_ocr(render_page(page, dpi, True), "", dpi)
+            if ocr_text is None or _has_invoice_marker(ocr_text):
+                return None
+            return "none of the invoice markers (SPEEDMECAHOME, NET À PAYER, TVA, DT) on the scanned first page"
+        finally:
+            doc.close()
+    
+    def _prescreen_ocr(self, image: Image.Image, tesseract_config: str, dpi: int) -> Optional[str]:
+        """OCR for prescreen; None when OCR isn't available"""
+        try:
+            if config.OCR_THREADS > 1:
+                # On an OCR thread, whose engine warm_up_ocr has already loaded
+                return _get_ocr_executor().submit(self.ocr_image, image, tesseract_config, dpi).result()
+            return self.ocr_image(image, tesseract_config, dpi)
+        except Exception as e:
+            print(f"Pre-screen OCR unavailable, skipping: {e}")
+            return None
+    
+    def build_context(self, source: PDFSource, use_ocr: bool = False,
+                      ctx: Optional[DocumentContext] = None) -> DocumentContext:
+        """Extract the PDF once into a DocumentContext shared by validation and extraction
+        
+        `source` may be a path, the PDF bytes or a binary buffer; only paths touch the disk.
+        Pages are added to `ctx` when given (e.g. one already timing a pre-screen).
+        """
+        label = describe_source(source)
+        print(f"Processing PDF: {label}")
+        ctx = ctx if ctx is not None else DocumentContext(source=label)
+        source = read_source(source)
+        
+        if use_ocr:
+            print("Using OCR for text extraction...")
+            with ctx.stage("ocr"):
+                for page in self.ocr_pages(source, ctx=ctx):
+                    ctx.add_page(page, "ocr")
+            return ctx
+        
+        # First try direct extraction (faster and uses less memory), then OCR
+        # only the pages whose text layer is missing or too thin to be real
+        with ctx.stage("fitz"):
+            layers = self.fitz_layers(source)
+        pages = [text for text, _ in layers]
+        words = [page_words for _, page_words in layers]
+        methods = ["fitz"] * len(pages)
+        needs_ocr = [i for i, page in enumerate(pages) if len(page.strip()) < config.MIN_PAGE_TEXT_CHARS]
+        
+        if not needs_ocr:
+            print("✓ Successfully extracted text directly from PDF")
+        else:
+            print(f"⚠ No usable text layer on page(s) {[i + 1 for i in needs_ocr]}, using OCR for them...")
+            with ctx.stage("ocr"):
+                ocr_texts = self.ocr_pages(source, page_numbers=needs_ocr, ctx=ctx)
+            for i, text in zip(needs_ocr, ocr_texts):
+                pages[i] = text
+                methods[i] = "ocr"
+                words[i] = None
+        
+        for page, method, page_words in zip(pages, methods, words):
+            ctx.add_page(page, method, page_words)
+        return ctx
+    
+    def extract_text_from_pdf(self, source: PDFSource, use_ocr: bool = False) -> str:
+        """Main method to extract text from PDF"""
+        return self.build_context(source, use_ocr).text
+    
+    def validate_pdf_structure(self, source: Union[PDFSource, DocumentContext]) -> bool:
+        """Basic validation that this is a SPEEDMECAHOME invoice
+        
+        Accepts an already built DocumentContext so the PDF is not extracted twice.
+        """
+        try:
+            ctx = source if isinstance(source, DocumentContext) else self.build_context(source)
             
-            markers_found = sum(1 for marker in required_markers if marker in text)
-            confidence = markers_found / len(required_markers)
+            with ctx.stage("validate"):
+                text = ctx.text
+                
+                markers_found = sum(1 for marker in _INVOICE_MARKERS if marker in text)
+                confidence = markers_found / len(_INVOICE_MARKERS)
             
             print(f"PDF validation confidence: {confidence:.1%}")
             return confidence >= 0.7
@@ -0,0 +1,138 @@
+import atexit
+import time
+from typing import Dict, Optional, Tuple
+
+import config
+from document import DocumentContext
+from extractor import extract_speedmechome_invoice, validate_invoice
+from pdf_processor import PDFProcessor, describe_source, render_page, set_ocr_slots
+from models import ExtractionResponse
+from profiler import SamplingProfiler
+
+# One processor per worker process, created by init_worker()
+_processor: Optional[PDFProcessor] = None
+
+def init_worker(ocr_slots=None, warm: bool = False):
+    """Process pool initializer: build the PDFProcessor once per worker
+    
+    `ocr_slots` is the instance-wide OCR semaphore created by the API process;
+    `warm` runs warm_up() so the worker's first document is as fast as the rest.
+    """
+    global _processor
+    if ocr_slots is not None:
+        set_ocr_slots(ocr_slots)
+    _processor = PDFProcessor()
+    # Load the OCR engine here, on the process's main thread (tesserocr requires it)
+    _processor.ocr_engine
+    # After the OCR threads are joined, when the pool (or the API process) exits
+    atexit.register(shutdown_worker)
+    if warm:
+        warm_up()
+
+def shutdown_worker():
+    """Release the worker's OCR engine (tesserocr's per-thread API objects)"""
+    global _processor
+    if _processor is not None:
+        _processor.close()
+        _processor = None
+
+def worker_ready() -> bool:
+    """No-op submitted at startup to make the pool start (and warm up) its workers"""
+    return _processor is not None
+
+def warm_up(ocr: bool = True) -> Dict[str, float]:
+    """Import fitz/PIL (and the OCR engine) and run one tiny render (and OCR) ahead of real traffic
+    
+    Pays the module imports, MuPDF's font setup and the OCR engine's language
+    model load on every OCR thread. Returns seconds per step; OCR errors (no
+    tesseract...) are printed, not raised.
+    """
+    timings = {}
+    start = time.perf_counter()
+    import fitz
+    doc = fitz.open()
+    page = doc.new_page(width=240, height=40)
+    page.insert_text((10, 25), "SPEEDMECAHOME 1 234,500 DT", fontsize=11)
+    image = render_page(page, config.OCR_DPI, config.OCR_GRAYSCALE)
+    doc.close()
+    timings["fitz"] = time.perf_counter() - start
+    
+    if ocr:
+        start = time.perf_counter()
+        try:
+            get_processor().warm_up_ocr(image)
+        except Exception as e:
+            print(f"⚠ OCR warm-up failed: {e}")
+        timings["ocr"] = time.perf_counter() - start
+    return timings
+
+def get_processor() -> PDFProcessor:
+    if _processor is None:
+        init_worker()
+    return _processor
+
+def run_pipeline(content: bytes, profile: bool = False) -> Tuple[ExtractionResponse, Dict]:
+    """Run the full PDF -> InvoiceModel pipeline on an uploaded PDF; returns the response
+    and the DocumentContext stats (stage timings, page methods)
+    
+    CPU-bound; called inside a worker process by api.extract_with_cache. The
+    stats are empty if the PDF could not be opened. With `profile`, they also
+    hold a sampled profile of the hot pipeline functions under "profile".
+    """
+    if not profile:
+        return _run_pipeline(content)
+    with SamplingProfiler() as profiler:
+        response, stats = _run_pipeline(content)
+    return response, dict(stats, profile=profiler.report())
+
+def _run_pipeline(content: bytes) -> Tuple[ExtractionResponse, Dict]:
+    ctx = None
+    try:
+        processor = get_processor()
+        ctx = DocumentContext(source=describe_source(content))
+        
+        # Reject documents that clearly aren't our invoices before paying for extraction/OCR
+        if config.PRESCREEN_ENABLED:
+            with ctx.stage("prescreen"):
+                reason = processor.prescreen(content)
+            if reason is not None:
+                return ExtractionResponse(
+                    success=False,
+                    errors=[f"The uploaded file doesn't appear to be a valid SPEEDMECAHOME invoice: {reason}"]
+                ), ctx.stats()
+        
+        # Extract text once, straight from memory; validation and extraction share the context
+        processor.build_context(content, ctx=ctx)
+        
+        # Validate it's a SPEEDMECAHOME invoice
+        if not processor.validate_pdf_structure(ctx):
+            return ExtractionResponse(
+                success=False,
+                errors=["The uploaded file doesn't appear to be a valid SPEEDMECAHOME invoice"]
+            ), ctx.stats()
+        
+        if not ctx.text or len(ctx.text.strip()) < 50:
+            return ExtractionResponse(
+                success=False,
+                errors=["Could not extract sufficient text from the PDF"]
+            ), ctx.stats()
+        
+        # Extract structured data
+        invoice_data = extract_speedmechome_invoice(ctx)
+        
+        # Validate the extracted data
+        with ctx.stage("validate_invoice"):
+            validation_passed = validate_invoice(invoice_data)
+        
+        return ExtractionResponse(
+            success=True,
+            data=invoice_data,
+            validation_passed=validation_passed,
+            warnings=["Some data validation issues found"] if not validation_passed else []
+        ), ctx.stats()
+        
+    except Exception as e:
+        return ExtractionResponse(
+            success=False,
+            errors=[f"Processing error: {str(e)}"]
+        ), ctx.stats() if ctx is not None else {}
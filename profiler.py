@@ -0,0 +1,109 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, Iterable, Optional
+
+import config
+
+# Modules whose functions show up in a profile; everything else (fitz, re,
+# pytesseract...) is attributed to the innermost of these functions calling it
+PROFILED_MODULES = ("extractor", "pdf_processor", "tables", "preprocess", "ocr_engine")
+
+# Threads sampled along with the calling one: the OCR executor's (see
+# pdf_processor._get_ocr_executor), where OCR and preprocessing run when OCR_THREADS > 1
+PROFILED_THREAD_PREFIXES = ("ocr",)
+
+class SamplingProfiler:
+    """Sample the stacks of the calling thread and the OCR threads every `interval_ms` while the block runs
+
+    Cheap enough for production requests: a background thread reads the
+    stacks with sys._current_frames(), nothing is traced. For each function
+    of `modules` it counts the samples where it was on a stack ("total") and
+    where it was the innermost profiled frame ("self"), per thread group:
+    "request" for the calling thread, else the thread name prefix ("ocr").
+    Milliseconds are the function's share of samples times the block's wall
+    time, since C code holding the GIL (fitz, regex) can delay individual
+    samples; OCR threads run in parallel, so their milliseconds can add up to
+    more than the wall time. The OCR threads are shared by the process:
+    concurrent extractions in it (WORKER_PROCESSES=0) show up too.
+    """
+
+    def __init__(self, interval_ms: int = config.PROFILE_INTERVAL_MS, modules: Iterable[str] = PROFILED_MODULES,
+                 thread_prefixes: Iterable[str] = PROFILED_THREAD_PREFIXES):
+        self.interval = max(interval_ms, 1) / 1000
+        self.modules = frozenset(modules)
+        self.thread_prefixes = tuple(thread_prefixes)
+        self.samples = 0
+        # Keyed by (thread group, function)
+        self.total: Counter = Counter()
+        self.self_time: Counter = Counter()
+        self._target: Optional[int] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._start = 0.0
+        self.elapsed = 0.0
+
+    def __enter__(self) -> "SamplingProfiler":
+        self._target = threading.get_ident()
+        self._start = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.elapsed = time.perf_counter() - self._start
+        self._stop.set()
+        self._thread.join()
+
+    def _thread_group(self, ident: int, names: Dict[int, str]) -> Optional[str]:
+        if ident == self._target:
+            return "request"
+        name = names.get(ident, "")
+        return next((prefix for prefix in self.thread_prefixes if name.startswith(prefix)), None)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.samples += 1
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                group = self._thread_group(ident, names)
+                if group is not None:
+                    self._sample(group, frame)
+
+    def _sample(self, group: str, frame):
+        innermost = None
+        on_stack = set()
+        while frame is not None:
+            code = frame.f_code
+            module = os.path.splitext(os.path.basename(code.co_filename))[0]
+            if module in self.modules:
+                name = (group, f"{module}.{getattr(code, 'co_qualname', code.co_name)}")
+                if innermost is None:
+                    innermost = name
+                on_stack.add(name)
+            frame = frame.f_back
+        self.total.update(on_stack)
+        if innermost is not None:
+            self.self_time[innermost] += 1
+
+    def report(self, limit: int = 20) -> Dict:
+        """Hottest functions by samples on the stack, with estimated milliseconds"""
+        ms_per_sample = self.elapsed * 1000 / self.samples if self.samples else 0.0
+        return {
+            "interval_ms": self.interval * 1000,
+            "wall_ms": round(self.elapsed * 1000, 1),
+            "samples": self.samples,
+            "functions": [
+                {
+                    "thread": group,
+                    "function": name,
+                    "total_samples": count,
+                    "self_samples": self.self_time[group, name],
+                    "total_ms": round(count * ms_per_sample, 1),
+                    "self_ms": round(self.self_time[group, name] * ms_per_sample, 1),
+                }
+                for (group, name), count in self.total.most_common(limit)
+            ],
+        }
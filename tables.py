@@ -0,0 +1,152 @@
+import re
+from bisect import bisect_right
+from typing import List, Optional, Sequence, Tuple
+
+from models import InvoiceItem
+
+# A fitz word box: (x0, y0, x1, y1, text, block_no, line_no, word_no)
+Word = Tuple[float, float, float, float, str, int, int, int]
+
+ITEM_COLUMNS = ['number', 'description', 'quantity', 'unit_price', 'vat_rate', 'total_ht']
+
+# Header words that start each column, in ITEM_COLUMNS order ('#' is optional)
+_HEADER_WORDS = {'#': 'number', 'Description': 'description', 'Quantité': 'quantity',
+                 'PU': 'unit_price', 'TVA': 'vat_rate', 'Total': 'total_ht'}
+
+# Words that end the items table
+_TABLE_END_WORDS = {'SOUS-TOTAL', 'TOTAL'}
+
+# Cell values sit slightly left of their header word
+_COLUMN_SLACK = 8.0
+# Words whose vertical centers are this close belong to the same row
+_ROW_TOLERANCE = 3.0
+
+_NUMBER_RE = re.compile(r'^\d+$')
+_AMOUNT_RE = re.compile(r'-?[\d\s]*\d(?:[,.]\d+)?')
+
+class ItemTableColumns:
+    """Column boundaries of the items table, taken from the header row's x positions"""
+
+    def __init__(self, header_y: float, starts: List[float], names: List[str]):
+        self.header_y = header_y
+        self.starts = starts
+        self.names = names
+
+    def column_of(self, word: Word) -> str:
+        # bisect over the column starts: O(log columns) per word
+        index = bisect_right(self.starts, word[0] + _COLUMN_SLACK) - 1
+        return self.names[max(index, 0)]
+
+def find_header(words: Sequence[Word]) -> Optional[ItemTableColumns]:
+    """Locate the Description / Quantité / PU HT ... header row of the items table"""
+    for word in words:
+        if word[4] != 'Description':
+            continue
+        row = [w for w in words if abs(_center(w) - _center(word)) <= _ROW_TOLERANCE]
+        columns = {}
+        for w in sorted(row, key=lambda w: w[0]):
+            name = _HEADER_WORDS.get(w[4])
+            if name and name not in columns:
+                columns[name] = w[0]
+        if 'quantity' in columns and 'unit_price' in columns:
+            columns.setdefault('number', float('-inf'))
+            ordered = sorted(columns.items(), key=lambda item: item[1])
+            names = [name for name, _ in ordered]
+            starts = [x for _, x in ordered]
+            # The first column extends to the page's left edge
+            starts[0] = float('-inf')
+            return ItemTableColumns(max(w[3] for w in row), starts, names)
+    return None
+
+def group_rows(words: Sequence[Word]) -> List[List[Word]]:
+    """Cluster words into rows by vertical position (words sorted once by y, x)"""
+    rows: List[List[Word]] = []
+    row_center = None
+    for word in sorted(words, key=lambda w: (_center(w), w[0])):
+        center = _center(word)
+        if row_center is None or center - row_center > _ROW_TOLERANCE:
+            rows.append([])
+            row_center = center
+        rows[-1].append(word)
+    return rows
+
+def extract_items_from_words(pages: Sequence[Optional[Sequence[Word]]]) -> List[InvoiceItem]:
+    """Rebuild the items table from fitz word boxes, assigning words to columns by x position
+
+    One pass per page. A table without a SOUS-TOTAL/TOTAL row continues at the
+    top of the next page, with the previous page's columns unless that page
+    repeats the header.
+    """
+    items: List[InvoiceItem] = []
+    columns: Optional[ItemTableColumns] = None
+    table_open = False
+
+    for words in pages:
+        if not words:
+            continue
+
+        header = find_header(words)
+        if header is not None:
+            columns = header
+            top = header.header_y
+        elif table_open and columns is not None:
+            top = float('-inf')
+        else:
+            continue
+
+        table_open = True
+        previous_was_item = False
+        for row in group_rows([w for w in words if w[1] >= top]):
+            if any(w[4] in _TABLE_END_WORDS for w in row):
+                table_open = False
+                break
+
+            cells = {name: [] for name in ITEM_COLUMNS}
+            for word in sorted(row, key=lambda w: w[0]):
+                cells[columns.column_of(word)].append(word[4])
+            cells = {name: ' '.join(texts) for name, texts in cells.items()}
+
+            item = _row_to_item(cells)
+            if item is not None:
+                items.append(item)
+            elif previous_was_item and cells['description'] and not cells['number'] and not cells['unit_price']:
+                # Description wrapped onto a second line
+                items[-1].description = f"{items[-1].description} {cells['description']}"
+                continue
+            previous_was_item = item is not None
+
+    return items
+
+def _row_to_item(cells: dict) -> Optional[InvoiceItem]:
+    if not _NUMBER_RE.match(cells['number']):
+        return None
+    unit_price = _parse_amount(cells['unit_price'])
+    if unit_price is None or not cells['description']:
+        return None
+
+    quantity = _parse_amount(cells['quantity'])
+    quantity = quantity if quantity is not None else 1.0
+    vat_rate = _parse_amount(cells['vat_rate'])
+    total_ht = _parse_amount(cells['total_ht'])
+
+    return InvoiceItem(
+        item_number=cells['number'],
+        description=cells['description'],
+        quantity=quantity,
+        unit_price=unit_price,
+        vat_rate=vat_rate / 100 if vat_rate is not None else 0.19,
+        total_ht=total_ht if total_ht is not None else unit_price * quantity
+    )
+
+def _parse_amount(cell: str) -> Optional[float]:
+    """'1 234,500 DT' -> 1234.5, '19 %' -> 19.0"""
+    match = _AMOUNT_RE.search(cell)
+    if not match:
+        return None
+    try:
+        return float(match.group(0).replace(' ', '').replace(',', '.'))
+    except ValueError:
+        return None
+
+def _center(word: Word) -> float:
+    return (word[1] + word[3]) / 2
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Dict, List, NamedTuple, Optional
+
+if TYPE_CHECKING:
+    import fitz
+
+class Zone(NamedTuple):
+    """A region of the page OCR'd on its own
+
+    Coordinates are fractions of the page width/height so the zone fits any
+    page size (A4 PDFs, scans whose page is the image size...).
+    """
+    name: str
+    x0: float
+    y0: float
+    x1: float
+    y1: float
+    dpi: int = 200
+    psm: int = 6  # tesseract page segmentation mode; 6 = one uniform block of text
+
+    def rect(self, page_rect: fitz.Rect) -> fitz.Rect:
+        import fitz
+        return fitz.Rect(
+            page_rect.x0 + self.x0 * page_rect.width,
+            page_rect.y0 + self.y0 * page_rect.height,
+            page_rect.x0 + self.x1 * page_rect.width,
+            page_rect.y0 + self.y1 * page_rect.height,
+        )
+
+    @property
+    def tesseract_config(self) -> str:
+        return f"--psm {self.psm}"
+
+class LayoutTemplate(NamedTuple):
+    """Zones to OCR on the first page of a known invoice layout, in reading order"""
+    name: str
+    zones: List[Zone]
+
+# Measured on invoice.pdf (A4, 595 x 842 pt) with a margin for scan skew/offset.
+# The logo, the right header (FACTURE / FAC number) and the supplier footer are
+# skipped: extract_speedmechome_invoice hard-codes the supplier fields. The body
+# zone spans the items table down to the amount in words because the totals
+# move down as the number of items grows.
+SPEEDMECAHOME_TEMPLATE = LayoutTemplate(
+    name="speedmecahome",
+    zones=[
+        Zone("client", 0.05, 0.16, 0.45, 0.27),
+        Zone("metadata", 0.64, 0.16, 0.95, 0.24),
+        Zone("body", 0.04, 0.31, 0.95, 0.87),
+        # The SPEEDMECAHOME line of the footer, for validate_pdf_structure and the
+        # pre-screen, with wide margins: scans are offset, skewed or not A4
+        Zone("brand", 0.0, 0.85, 0.35, 0.93, dpi=150),
+    ]
+)
+
+TEMPLATES: Dict[str, LayoutTemplate] = {
+    SPEEDMECAHOME_TEMPLATE.name: SPEEDMECAHOME_TEMPLATE,
+}
+
+def get_template(name: Optional[str]) -> Optional[LayoutTemplate]:
+    """Look up a template by name; empty or "none" disables zone OCR"""
+    if not name or name.lower() == "none":
+        return None
+    return TEMPLATES[name.lower()]
@@ -0,0 +1,51 @@
+import io
+import json
+import zipfile
+
+import pytest
+from fastapi.testclient import TestClient
+
+import api
+from benchmarks.synthetic import generate_invoice
+from models import ExtractionResponse
+
+def _zip(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, content in members:
+            archive.writestr(name, content)
+    return buffer.getvalue()
+
+def _corrupt_member(data: bytes, name: str) -> bytes:
+    """Flip bytes in the middle of a member's compressed data (its CRC/inflate then fails)"""
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        info = archive.getinfo(name)
+    # Local header: 30 bytes + file name + extra field, then the compressed data
+    start = info.header_offset + 30 + len(info.filename.encode()) + len(info.extra)
+    middle = start + info.compress_size // 2
+    data = bytearray(data)
+    for offset in range(middle, middle + 16):
+        data[offset] ^= 0xFF
+    return bytes(data)
+
+@pytest.fixture
+def client(monkeypatch):
+    async def fake_extract(content, wait=False):
+        return ExtractionResponse(success=True)
+    monkeypatch.setattr(api, "extract_with_cache", fake_extract)
+    # Not used as a context manager: no startup, so no worker pool
+    return TestClient(api.app)
+
+def test_corrupt_zip_member_does_not_abort_batch(client):
+    pdf = generate_invoice(2)
+    archive = _corrupt_member(_zip([("good.pdf", pdf), ("broken.pdf", pdf)]), "broken.pdf")
+    response = client.post("/extract-invoices", files=[
+        ("files", ("invoices.zip", archive, "application/zip")),
+        ("files", ("single.pdf", pdf, "application/pdf")),
+    ])
+    assert response.status_code == 200
+    results = {item["filename"]: item for item in map(json.loads, response.text.splitlines())}
+    assert set(results) == {"good.pdf", "broken.pdf", "single.pdf"}
+    assert results["good.pdf"]["success"] and results["single.pdf"]["success"]
+    assert not results["broken.pdf"]["success"]
+    assert results["broken.pdf"]["errors"][0].startswith("Unreadable zip entry")
@@ -0,0 +1,88 @@
+import os
+import random
+
+import fitz
+import pytest
+
+import extractor
+import legacy_extractor
+from models import InvoiceModel
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FINANCIAL_FIELDS = {'subtotal_ht', 'vat_breakdown', 'total_ht', 'total_vat', 'fiscal_stamp', 'total_ttc',
+                    'amount_in_words'}
+TEXT_FIELDS = set(InvoiceModel.model_fields) - FINANCIAL_FIELDS
+
+# Lines inserted at random: look-alikes of every field the scanner reads
+EXTRA_LINES = ["1  vidange  1  18,000 DT  19 %  18,000 DT", "2   FILTRE HUILE   1   12,440 DT",
+               "Description Quantité PU HT TVA Total", "Tél : +216 22 333 444", "MF 123 A", "client@x.tn",
+               "CLIENT", "", "12 TU 34", "999 KM", "Date 31-02-2024", "Date 01-01-2023", "BL-1234 BL-99"]
+FINANCIAL_LINES = ["TOTAL 5,000 DT", "TVA 19 % 3,000 DT 0,570 DT", "NET À PAYER 10,0 DT", "Timbre 0,600 DT",
+                   "SOUS-TOTAL HT : 7,5 DT", "Arrêtée la présente facture à la somme de :", "dix dinars"]
+FINANCIAL_WORDS = ('DT', 'TOTAL', 'TVA', 'TIMBRE', 'NET', 'ARRÊTÉE', '%')
+
+VARIANTS = 3000
+
+@pytest.fixture(scope="module")
+def sample_texts():
+    with open(os.path.join(ROOT, "invoice_extracted.txt"), encoding="utf-8") as f:
+        markdown = f.read()
+    doc = fitz.open(os.path.join(ROOT, "invoice.pdf"))
+    layer = "".join(page.get_text() + "\n" for page in doc)
+    doc.close()
+    return [markdown, layer]
+
+def _mutate(rng: random.Random, text: str, keep_totals: bool) -> str:
+    """Insert, delete, pad and shuffle lines; with `keep_totals`, leave the totals block in order"""
+    lines = text.split('\n')
+    for _ in range(rng.randint(0, 8)):
+        op = rng.random()
+        if op < 0.4:
+            lines.insert(rng.randrange(len(lines) + 1),
+                         rng.choice(EXTRA_LINES if keep_totals else EXTRA_LINES + FINANCIAL_LINES))
+        elif op < 0.6 and lines:
+            index = rng.randrange(len(lines))
+            if not keep_totals or not any(word in lines[index].upper() for word in FINANCIAL_WORDS):
+                del lines[index]
+        elif op < 0.8 and lines:
+            index = rng.randrange(len(lines))
+            lines[index] = '  ' + lines[index] + '  '
+        elif not keep_totals:
+            rng.shuffle(lines)
+    return '\n'.join(lines)
+
+def _fields(module, text: str, names: set) -> dict:
+    data = module.extract_speedmechome_invoice(text).model_dump()
+    # Missing dates default to now(); compare the day only
+    data['invoice_date'] = data['invoice_date'].date()
+    return {name: value for name, value in data.items() if name in names}
+
+def test_field_scan_matches_legacy_extractor(sample_texts):
+    rng = random.Random(0)
+    for _ in range(VARIANTS):
+        text = _mutate(rng, rng.choice(sample_texts), keep_totals=False)
+        assert _fields(extractor, text, TEXT_FIELDS) == _fields(legacy_extractor, text, TEXT_FIELDS), text
+
+def test_amounts_match_legacy_extractor(sample_texts):
+    # Amounts are only looked for in a window after their label, so the totals block
+    # stays in order; the old DOTALL patterns could reach across the whole document
+    rng = random.Random(0)
+    for _ in range(VARIANTS):
+        text = _mutate(rng, rng.choice(sample_texts), keep_totals=True)
+        assert _fields(extractor, text, FINANCIAL_FIELDS) == _fields(legacy_extractor, text, FINANCIAL_FIELDS), text
+
+def test_sample_invoice_amounts(sample_texts):
+    for text in sample_texts:
+        invoice = extractor.extract_speedmechome_invoice(text)
+        assert invoice.subtotal_ht == 51.6
+        assert invoice.total_vat == 9.804
+        assert invoice.fiscal_stamp == 1.0
+        assert invoice.total_ttc == 62.404
+        assert [(v.rate, v.base, v.amount) for v in invoice.vat_breakdown] == [(0.19, 51.6, 9.804)]
+
+@pytest.mark.parametrize("gap, found", [(140, True), (180, False)])
+def test_amount_window(gap, found):
+    data = {}
+    extractor.extract_financial_data("Timbre fiscal" + " " * gap + "1,000 DT\n", data)
+    assert data.get('fiscal_stamp') == (1.0 if found else None)
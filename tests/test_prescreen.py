@@ -0,0 +1,56 @@
+import fitz
+import pytest
+
+from benchmarks.synthetic import generate_invoice, scanned_variant
+from pdf_processor import PDFProcessor
+
+LOREM = "Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do eiusmod tempor incididunt."
+
+def _text_pdf(*lines: str) -> bytes:
+    doc = fitz.open()
+    page = doc.new_page()
+    for index, line in enumerate(lines):
+        page.insert_text((50, 72 + 20 * index), line, fontname="helv")
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+@pytest.fixture
+def processor():
+    return PDFProcessor(use_ocr_cache=False)
+
+def test_accepts_invoice(processor):
+    assert processor.prescreen(generate_invoice(2)) is None
+
+def test_accepts_misread_brand_in_text_layer(processor):
+    # e.g. a scanner's searchable-PDF layer
+    assert processor.prescreen(_text_pdf("SPEEDMECAH0ME", LOREM)) is None
+
+def test_accepts_other_invoice_markers(processor):
+    # Brand only in an image: validate_pdf_structure passes on the other markers
+    assert processor.prescreen(_text_pdf(LOREM, "TVA 19 %", "NET A PAYER 100,000 DT")) is None
+
+def test_rejects_unrelated_document(processor):
+    assert processor.prescreen(_text_pdf(LOREM, LOREM)) is not None
+
+@pytest.fixture
+def ocr_processor(processor):
+    from PIL import Image
+    try:
+        processor.ocr_image(Image.new("L", (64, 32), 255))
+    except Exception as e:
+        pytest.skip(f"OCR unavailable: {e}")
+    return processor
+
+def test_accepts_skewed_scan(ocr_processor):
+    assert ocr_processor.prescreen(scanned_variant(generate_invoice(3), skew=1.0, seed=2)) is None
+
+def test_accepts_scan_when_brand_crop_misses(ocr_processor):
+    # Letter-size page: the footer is nowhere near the A4 brand zone
+    source = fitz.open(stream=generate_invoice(3), filetype="pdf")
+    letter = fitz.open()
+    letter.new_page(width=612, height=792).show_pdf_page(fitz.Rect(0, 0, 595, 842), source, 0)
+    assert ocr_processor.prescreen(scanned_variant(letter.tobytes())) is None
+
+def test_rejects_unrelated_scan(ocr_processor):
+    assert ocr_processor.prescreen(scanned_variant(_text_pdf(LOREM, LOREM))) is not None
@@ -0,0 +1,70 @@
+import re
+
+import fitz
+import pytest
+
+from benchmarks.synthetic import ITEM_COLUMNS_X, ITEM_HEADER, PARTS, generate_invoice
+from extractor import extract_speedmechome_invoice
+from pdf_processor import PDFProcessor
+from tables import _parse_amount, extract_items_from_words
+
+HEADER_Y = 100
+WRAPPED_PARTS = [part for part in PARTS
+                 if fitz.get_text_length(part, fontsize=9) > ITEM_COLUMNS_X[2] - ITEM_COLUMNS_X[1] - 4]
+
+def _word(x: float, y: float, text: str):
+    """A fitz-style word box, 9pt high with its baseline at `y`"""
+    return (x, y - 9, x + 6 * len(text), y, text, 0, 0, 0)
+
+def _header(y: float = HEADER_Y):
+    return [_word(x, y, word) for x, label in ITEM_HEADER for word in label.split()]
+
+def _row(y: float, *cells: str, dx: float = 0, dy: float = 0):
+    return [_word(x + dx, y + dy, cell) for x, cell in zip(ITEM_COLUMNS_X, cells) if cell]
+
+@pytest.fixture(scope="module")
+def processor():
+    return PDFProcessor(use_ocr_cache=False)
+
+def test_two_page_table_with_wrapped_descriptions(processor):
+    ctx = processor.build_context(generate_invoice(35))
+    assert len(ctx.pages) == 2
+
+    invoice = extract_speedmechome_invoice(ctx)
+    assert [item.item_number for item in invoice.items] == [str(n) for n in range(1, 36)]
+    # e.g. COURROIE DISTRIBUTION is printed on two lines
+    assert any(item.description in WRAPPED_PARTS for item in invoice.items)
+    for item in invoice.items:
+        assert item.description in PARTS
+        assert item.vat_rate == 0.19
+        assert item.total_ht == pytest.approx(item.quantity * item.unit_price, abs=0.001)
+    subtotal = re.search(r'SOUS-TOTAL HT :\s*([\d ]+,\d+) DT', ctx.text).group(1)
+    assert sum(item.total_ht for item in invoice.items) == pytest.approx(_parse_amount(subtotal), abs=0.001)
+
+def test_cells_left_of_header_and_uneven_baselines():
+    words = _header() + _row(130, "1", "vidange", "2", "18,000 DT", "19 %", "36,000 DT", dx=-4, dy=2)
+    words += _row(152, "2", "FILTRE", "1", "1 234,500 DT", "7 %", "1 234,500 DT")
+    # A description word just short of the Quantité header
+    words += [_word(ITEM_COLUMNS_X[2] - 12, 152 - 2, "HUILE")]
+    items = extract_items_from_words([words])
+    assert [(i.item_number, i.description, i.quantity, i.unit_price, i.vat_rate, i.total_ht) for i in items] == [
+        ("1", "vidange", 2.0, 18.0, 0.19, 36.0),
+        ("2", "FILTRE HUILE", 1.0, 1234.5, 0.07, 1234.5),
+    ]
+
+def test_rows_stop_at_subtotal():
+    words = _header() + _row(130, "1", "vidange", "1", "18,000 DT", "19 %", "18,000 DT")
+    words += [_word(335, 152, "SOUS-TOTAL"), _word(477, 152, "18,000 DT")]
+    words += _row(174, "2", "FILTRE", "1", "5,000 DT", "19 %", "5,000 DT")
+    assert [item.item_number for item in extract_items_from_words([words])] == ["1"]
+
+def test_table_continues_on_next_page_without_header():
+    first = _header() + _row(130, "1", "vidange", "1", "18,000 DT", "19 %", "18,000 DT")
+    second = _row(60, "2", "FILTRE", "1", "5,000 DT", "19 %", "5,000 DT")
+    second += [_word(335, 82, "SOUS-TOTAL"), _word(477, 82, "23,000 DT")]
+    third = _row(60, "3", "DIAGNOSTIC", "1", "9,000 DT", "19 %", "9,000 DT")
+    items = extract_items_from_words([first, None, second, third])
+    assert [item.item_number for item in items] == ["1", "2"]
+
+def test_no_header_no_items():
+    assert extract_items_from_words([_row(130, "1", "vidange", "1", "18,000 DT", "19 %", "18,000 DT")]) == []
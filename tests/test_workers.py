@@ -0,0 +1,30 @@
+import asyncio
+import time
+
+import pytest
+
+from workers import ExtractionPool, PoolSaturated
+
+def test_cancelled_caller_keeps_slot_until_job_ends():
+    async def scenario():
+        pool = ExtractionPool(workers=0, max_pending=0)
+        try:
+            job = asyncio.create_task(pool.run(time.sleep, 1.5))
+            await asyncio.sleep(0.3)
+            job.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await job
+
+            # The sleep is still running: no room for another job yet
+            assert pool.in_flight == 1
+            with pytest.raises(PoolSaturated):
+                await pool.run(time.sleep, 0)
+
+            start = time.perf_counter()
+            await pool.run(time.sleep, 0, wait=True)
+            assert time.perf_counter() - start > 0.8
+            assert pool.in_flight == 0
+        finally:
+            pool.shutdown()
+
+    asyncio.run(scenario())
@@ -0,0 +1,83 @@
+import asyncio
+from typing import Optional
+
+from fastapi import UploadFile
+
+import config
+
+# "%PDF-" must appear within the first 1024 bytes (PDF 32000-1, 7.5.2 / implementation note)
+PDF_MAGIC = b"%PDF-"
+PDF_HEADER_WINDOW = 1024
+
+# Room for the multipart boundary and part headers around a single file
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+class UploadRejected(Exception):
+    """An upload refused before extraction; `status_code` is the HTTP status to answer with"""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+def too_large_message(max_bytes: int = config.MAX_UPLOAD_BYTES) -> str:
+    return f"File exceeds the {max_bytes} byte limit"
+
+def has_pdf_header(head: bytes) -> bool:
+    return PDF_MAGIC in head[:PDF_HEADER_WINDOW]
+
+async def read_upload(upload: UploadFile, max_bytes: int = config.MAX_UPLOAD_BYTES,
+                      chunk_size: int = config.UPLOAD_CHUNK_BYTES) -> bytes:
+    """Read an upload chunk by chunk from its spooled file, failing fast
+
+    Raises UploadRejected as soon as the first chunk doesn't look like a PDF
+    or the total passes `max_bytes`, without reading the rest.
+    """
+    chunks = []
+    size = 0
+    while True:
+        chunk = await upload.read(chunk_size)
+        if not chunk:
+            break
+        if not chunks and not has_pdf_header(chunk):
+            raise UploadRejected("File is not a PDF")
+        size += len(chunk)
+        if size > max_bytes:
+            raise UploadRejected(too_large_message(max_bytes), status_code=413)
+        chunks.append(chunk)
+    if not chunks:
+        raise UploadRejected("File is empty")
+    return b"".join(chunks)
+
+def inspect_pdf(content: bytes, max_pages: int = config.MAX_PDF_PAGES) -> Optional[str]:
+    """Cheap structural checks (header, password, page count); returns the rejection reason or None
+
+    Opening with fitz only parses the xref table, no page content, so this costs
+    milliseconds even for PDFs extraction would spend seconds on.
+    """
+    import fitz  # imported on first use, like in pdf_processor
+    if not has_pdf_header(content):
+        return "File is not a PDF"
+    try:
+        doc = fitz.open(stream=content, filetype="pdf")
+    except Exception:
+        return "File is not a readable PDF"
+    try:
+        # Owner-password-only PDFs (printing/copy restrictions) open fine; only a user password blocks reading
+        if doc.needs_pass:
+            return "Password-protected PDFs are not supported"
+        if doc.page_count == 0:
+            return "PDF has no pages"
+        if doc.page_count > max_pages:
+            return f"PDF has {doc.page_count} pages, more than the {max_pages} allowed"
+        return None
+    finally:
+        doc.close()
+
+async def read_pdf_upload(upload: UploadFile) -> bytes:
+    """read_upload + inspect_pdf: the PDF bytes, or UploadRejected before any extraction work"""
+    content = await read_upload(upload)
+    reason = await asyncio.to_thread(inspect_pdf, content)
+    if reason is not None:
+        raise UploadRejected(reason)
+    return content
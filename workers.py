@@ -0,0 +1,108 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional, Union
+
+import config
+
+# spawn, not fork: the API process already runs an event loop and threads.
+# Objects shared with workers (e.g. semaphores) must come from this context.
+MP_CONTEXT = multiprocessing.get_context("spawn")
+
+class PoolSaturated(Exception):
+    """Raised when every worker is busy and the admission queue is full"""
+
+class ExtractionPool:
+    """Process pool for the CPU-bound extraction pipeline, with bounded admission
+
+    At most `workers` jobs run at once and at most `max_pending` more wait for a
+    worker; anything beyond that is rejected immediately with PoolSaturated so
+    the event loop never queues unbounded work. `initargs` may be a callable,
+    called again each time the pool is (re)started.
+    """
+
+    def __init__(self, workers: int = config.WORKER_PROCESSES,
+                 max_pending: int = config.MAX_PENDING_EXTRACTIONS,
+                 initializer: Optional[Callable] = None, initargs: Union[tuple, Callable[[], tuple]] = ()):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.initializer = initializer
+        self.initargs = initargs
+        self._executor: Optional[Executor] = None
+        self._admitted = 0
+        self._slot_freed = asyncio.Condition()
+        self._notifications = set()
+
+    @property
+    def capacity(self) -> int:
+        return max(self.workers, 1) + self.max_pending
+
+    @property
+    def in_flight(self) -> int:
+        return min(self._admitted, max(self.workers, 1))
+
+    @property
+    def queue_depth(self) -> int:
+        return max(0, self._admitted - max(self.workers, 1))
+
+    def start(self):
+        if self._executor is not None:
+            return
+        if self.workers > 0:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=MP_CONTEXT,
+                initializer=self.initializer,
+                initargs=self.initargs() if callable(self.initargs) else self.initargs,
+            )
+        else:
+            # In-process mode (the caller ran the initializer itself): one thread per admitted job
+            self._executor = ThreadPoolExecutor(max_workers=self.capacity, thread_name_prefix="extract")
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def run(self, fn: Callable, *args, wait: bool = False) -> Any:
+        """Run fn(*args) in a worker
+
+        Raises PoolSaturated immediately when the pool is full, unless `wait` is
+        set (background jobs, batches), in which case it waits for a free slot.
+        """
+        while self._admitted >= self.capacity:
+            if not wait:
+                raise PoolSaturated(f"{self._admitted} extractions already admitted")
+            async with self._slot_freed:
+                await self._slot_freed.wait()
+
+        self._admitted += 1
+        loop = asyncio.get_running_loop()
+        try:
+            self.start()
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._release()
+            raise
+        # The slot is held until the job itself ends: a cancelled caller (e.g. a
+        # disconnected batch) doesn't stop a job that is already running
+        future.add_done_callback(lambda _: loop.call_soon_threadsafe(self._release))
+        try:
+            return await asyncio.wrap_future(future)
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM-killed); replace the pool for later requests
+            print("⚠ Worker process died, restarting extraction pool")
+            self.shutdown()
+            raise
+
+    def _release(self):
+        """Give back an admission slot (on the event loop thread) and wake one waiter"""
+        self._admitted -= 1
+        task = asyncio.ensure_future(self._notify_slot_freed())
+        self._notifications.add(task)
+        task.add_done_callback(self._notifications.discard)
+
+    async def _notify_slot_freed(self):
+        async with self._slot_freed:
+            self._slot_freed.notify()